@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, session, abort, redirect, url_for, flash, request
 from werkzeug.security import generate_password_hash
-from models import db, User, Product, ChatSession, Message
+from models import db, User, Product, ChatSession, ChatSessionEnd, Message
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -32,6 +32,8 @@ def terminate_chat(session_id):
     if not session.get('is_admin'):
         abort(403)
     cs = ChatSession.query.get_or_404(session_id)
+    if cs.active:
+        db.session.add(ChatSessionEnd(session_id=cs.id))
     cs.active = False
     cs.handed_to_human = True
     # Log system message
@@ -0,0 +1,109 @@
+"""
+Per-product negotiation analytics, materialized in the product_stats table.
+
+Routes call the record_* helpers inside their own transaction, so a stats
+row changes in the same commit as the event it counts. `rebuild` recomputes
+the whole table from chat_session and deal in a single INSERT ... SELECT:
+
+    flask --app app rebuild-product-stats
+"""
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, insert, select
+from models import db, Product, ChatSession, Deal, ProductStats
+import tenancy
+
+
+def _increment(product_id, **deltas):
+    values = {getattr(ProductStats, k): getattr(ProductStats, k) + v for k, v in deltas.items()}
+    values[ProductStats.updated_at] = datetime.utcnow()
+    updated = (
+        ProductStats.query
+                    .filter_by(product_id=product_id)
+                    .update(values, synchronize_session=False)
+    )
+    if not updated:
+        row = dict(sessions=0, closed_sessions=0, deals=0, discount_total=0.0, time_to_deal_total=0.0)
+        row.update(deltas)
+        db.session.add(ProductStats(product_id=product_id, **row))
+
+
+def record_session_opened(product_id):
+    _increment(product_id, sessions=1)
+
+
+def record_session_closed(product_id):
+    _increment(product_id, closed_sessions=1)
+
+
+def record_deal(product, price, cs=None, user_id=None):
+    """Store a Deal row and fold it into the product's stats."""
+    now = datetime.utcnow()
+    db.session.add(Deal(
+        product_id=product.id,
+        session_id=cs.id if cs else None,
+        user_id=user_id,
+        list_price=product.price,
+        price=price,
+        created_at=now
+    ))
+    _increment(
+        product.id,
+        deals=1,
+        discount_total=round(max(0.0, product.price - price), 2),
+        time_to_deal_total=(now - cs.created_at).total_seconds() if cs and cs.created_at else 0.0
+    )
+
+
+def rebuild():
+    """Recompute product_stats for every product in one pass."""
+    sessions = (
+        select(
+            ChatSession.product_id.label('product_id'),
+            func.count().label('sessions'),
+            func.sum(case((ChatSession.active == False, 1), else_=0)).label('closed'),
+        )
+        .group_by(ChatSession.product_id)
+        .subquery()
+    )
+    seconds = (func.julianday(Deal.created_at) - func.julianday(ChatSession.created_at)) * 86400
+    deals = (
+        select(
+            Deal.product_id.label('product_id'),
+            func.count().label('deals'),
+            func.sum(func.max(Deal.list_price - Deal.price, 0)).label('discount'),
+            func.sum(func.coalesce(seconds, 0)).label('seconds'),
+        )
+        .outerjoin(ChatSession, ChatSession.id == Deal.session_id)
+        .group_by(Deal.product_id)
+        .subquery()
+    )
+    rows = (
+        select(
+            Product.id,
+            func.coalesce(sessions.c.sessions, 0),
+            func.coalesce(sessions.c.closed, 0),
+            func.coalesce(deals.c.deals, 0),
+            func.coalesce(deals.c.discount, 0.0),
+            func.coalesce(deals.c.seconds, 0.0),
+            func.datetime('now'),
+        )
+        .outerjoin(sessions, sessions.c.product_id == Product.id)
+        .outerjoin(deals, deals.c.product_id == Product.id)
+    )
+    db.session.execute(ProductStats.__table__.delete())
+    db.session.execute(insert(ProductStats).from_select(
+        ['product_id', 'sessions', 'closed_sessions', 'deals',
+         'discount_total', 'time_to_deal_total', 'updated_at'],
+        rows
+    ))
+    db.session.commit()
+    return ProductStats.query.count()
+
+
+@click.command("rebuild-product-stats")
+@with_appcontext
+def rebuild_product_stats():
+    """Recompute the product_stats table from sessions and deals."""
+    print(f"✅ Rebuilt stats for {sum(rebuild() for _ in tenancy.each_store())} product(s).")
@@ -1,45 +1,103 @@
 import os
+import click
 from dotenv import load_dotenv
 from flask import Flask, render_template
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from models import db
-import openai
+from session_cookie import CachedSessionInterface
+from http_cache import catalog_page
+import shared_state
+import http_cache
+import tenancy
 
 # ─── Load environment variables from .env ───────
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'fallback-key')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///chatbot.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db.init_app(app)
+# ─── SQLite tuning for several workers on one file
+@event.listens_for(Engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _record):
+    if type(dbapi_conn).__module__ != "sqlite3":
+        return
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")    # readers don't block the writer
+    cur.execute("PRAGMA busy_timeout=15000")  # wait for the write lock instead of failing
+    cur.close()
 
-# ─── Configure OpenAI (default provider) ────────
-openai.api_key = os.getenv("OPENAI_API_KEY")
-if not openai.api_key:
-    raise RuntimeError("OPENAI_API_KEY not set in environment or .env")
 
 # ─── Landing page ───────────────────────────────
-@app.route("/")
+@catalog_page
 def index():
     return render_template("index.html")
 
-# ─── Register blueprints ────────────────────────
-from auth_routes    import auth_bp
-from store_routes   import store_bp
-from product_routes import product_bp
-from chat_routes    import chat_bp
-from cart_routes    import cart_bp
 
-app.register_blueprint(auth_bp)
-app.register_blueprint(store_bp)
-app.register_blueprint(product_bp)
-app.register_blueprint(chat_bp)
-app.register_blueprint(cart_bp)
+# ─── Schema creation: `flask --app app init-db` ─
+@click.command("init-db")
+@with_appcontext
+def init_db():
+    """Create any missing tables."""
+    if tenancy.enabled():
+        tenancy.create_directory(db)
+        for store_id in tenancy.each_store():
+            tenancy.create_shard(store_id, db.metadata)
+    else:
+        db.create_all()
+    print("✅ Database tables created.")
+
+
+def create_app(config=None):
+    """
+    WSGI application factory. Every worker process builds its own app;
+    anything that must be shared between workers goes through the
+    `shared_state` backend (SHARED_STATE_URL), not module globals.
+    """
+    # ─── Check OpenAI key (SDK is loaded lazily) ────
+    if not os.getenv("OPENAI_API_KEY"):
+        raise RuntimeError("OPENAI_API_KEY not set in environment or .env")
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'fallback-key')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///chatbot.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SHARED_STATE_URL'] = os.getenv('SHARED_STATE_URL', 'memory://')
+    app.config['DYNAMIC_PRICING']  = os.getenv('DYNAMIC_PRICING', '') == '1'
+    app.config['TENANT_SHARDING']  = os.getenv('TENANT_SHARDING', '') == '1'
+    app.config['SESSION_REFRESH_EACH_REQUEST'] = False
+    if config:
+        app.config.update(config)
+
+    app.session_interface = CachedSessionInterface()
+    db.init_app(app)
+    shared_state.init_app(app)
+    http_cache.init_app(app)
+    tenancy.init_app(app)
+
+    app.add_url_rule("/", "index", index)
+
+    # ─── Register blueprints ────────────────────────
+    from auth_routes    import auth_bp
+    from store_routes   import store_bp
+    from product_routes import product_bp
+    from chat_routes    import chat_bp
+    from cart_routes    import cart_bp
+
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(store_bp)
+    app.register_blueprint(product_bp)
+    app.register_blueprint(chat_bp)
+    app.register_blueprint(cart_bp)
+
+    from archive import archive_chats
+    from analytics import rebuild_product_stats
+    from product_brief import brief_report
+    app.cli.add_command(init_db)
+    app.cli.add_command(archive_chats)
+    app.cli.add_command(rebuild_product_stats)
+    app.cli.add_command(brief_report)
+    return app
 
-# ─── Ensure tables exist ────────────────────────
-with app.app_context():
-    db.create_all()
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,96 @@
+"""
+Archival of ended chat sessions.
+
+Messages of sessions that ended more than N days ago are packed into one
+zlib-compressed JSON blob per session (ChatArchive) and deleted from the
+live `message` table. session_messages() reads either form transparently.
+
+    flask --app app archive-chats --days 30
+"""
+import json
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from models import db, ChatSession, ChatSessionEnd, ChatArchive, Message
+import tenancy
+
+ArchivedMessage = namedtuple('ArchivedMessage', 'role content timestamp')
+
+
+def pack_transcript(messages):
+    return zlib.compress(json.dumps([
+        [m.role, m.content, m.timestamp.isoformat() if m.timestamp else None]
+        for m in messages
+    ]).encode('utf-8'), 9)
+
+
+def unpack_transcript(blob):
+    return [
+        ArchivedMessage(role, content, datetime.fromisoformat(ts) if ts else None)
+        for role, content, ts in json.loads(zlib.decompress(blob).decode('utf-8'))
+    ]
+
+
+def session_messages(cs):
+    """Chat history for a session, in order, whether live or archived."""
+    if not cs.active and cs.archive is not None:
+        return unpack_transcript(cs.archive.transcript)
+    return (
+        Message.query
+               .filter_by(session_id=cs.id)
+               .order_by(Message.timestamp)
+               .all()
+    )
+
+
+def ended_at():
+    """When a session ended; sessions ended before ends were recorded fall back to created_at."""
+    return db.func.coalesce(ChatSessionEnd.ended_at, ChatSession.created_at)
+
+
+def archive_ended_sessions(older_than_days=30, batch_size=200):
+    """Archive sessions that ended before the cutoff; returns how many were archived."""
+    cutoff   = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        ids = [
+            sid for (sid,) in
+            db.session.query(ChatSession.id)
+                      .outerjoin(ChatSessionEnd)
+                      .outerjoin(ChatArchive)
+                      .filter(ChatSession.active == False,
+                              ended_at() < cutoff,
+                              ChatArchive.session_id == None)
+                      .limit(batch_size)
+                      .all()
+        ]
+        if not ids:
+            return archived
+
+        by_session = {sid: [] for sid in ids}
+        for m in (Message.query
+                         .filter(Message.session_id.in_(ids))
+                         .order_by(Message.session_id, Message.timestamp, Message.id)):
+            by_session[m.session_id].append(m)
+
+        for sid, msgs in by_session.items():
+            db.session.add(ChatArchive(
+                session_id=sid,
+                message_count=len(msgs),
+                transcript=pack_transcript(msgs)
+            ))
+        Message.query.filter(Message.session_id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        archived += len(ids)
+
+
+@click.command("archive-chats")
+@click.option("--days", default=30, show_default=True,
+              help="Archive sessions that ended more than this many days ago.")
+@with_appcontext
+def archive_chats(days):
+    """Move old ended chat transcripts into compressed archive blobs."""
+    count = sum(archive_ended_sessions(days) for _ in tenancy.each_store())
+    print(f"✅ Archived {count} chat session(s).")
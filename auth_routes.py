@@ -1,9 +1,62 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
+from sqlalchemy.orm import joinedload
 from models import db, User, Store
+from passwords import hash_password, rehash_password, verify_password, needs_rehash, VerifierBusy
+from rate_limit import rate_limited, peek, consume
+from http_cache import bump_catalog
+import tenancy
 
 auth_bp = Blueprint('auth', __name__)
 
+
+def _login_keys(**_):
+    # Every attempt is charged to the client address. The account is charged
+    # only for failed attempts (see _account_limited), so nobody can lock a
+    # user out just by posting their name.
+    return f"ip:{request.remote_addr}"
+
+
+def _account_key(username):
+    return f"user:{username.strip().lower()}"
+
+
+def _check_login(user, password):
+    """Verify the password, upgrading the stored hash if the policy changed."""
+    if not user or not verify_password(user.password_hash, password):
+        return False
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = rehash_password(password)
+            db.session.commit()
+        except VerifierBusy:
+            pass    # keep the old hash; the next login upgrades it
+    return True
+
+
+def _verifier_busy(template):
+    flash("We're handling a lot of logins right now. Please try again in a moment.", "warning")
+    resp = current_app.make_response((render_template(template), 503))
+    resp.headers['Retry-After'] = '5'
+    return resp
+
+
+def _login_limited(template):
+    def on_limit(retry_after):
+        flash(f"Too many login attempts. Try again in {retry_after}s.", "danger")
+        return render_template(template), 429
+    return on_limit
+
+
+def _account_limited(username, template):
+    """429 response if this account has used up its failed attempts, else None."""
+    allowed, retry_after = peek('login', _account_key(username))
+    if allowed:
+        return None
+    resp = current_app.make_response(_login_limited(template)(retry_after))
+    resp.headers['Retry-After'] = str(retry_after)
+    return resp
+
+
 @auth_bp.route('/register', methods=['GET','POST'])
 def register():
     if request.method == 'POST':
@@ -15,7 +68,7 @@ def register():
             flash("Username already taken.", "danger")
         else:
             user = User(username=username,
-                        password_hash=generate_password_hash(password))
+                        password_hash=hash_password(password))
             db.session.add(user)
             db.session.commit()
             flash("Account created. Please log in.", "success")
@@ -23,12 +76,22 @@ def register():
     return render_template('register.html')
 
 @auth_bp.route('/login', methods=['GET','POST'])
+@rate_limited('login', _login_keys, _login_limited('login.html'), methods=('POST',))
 def login():
     if request.method == 'POST':
         username = request.form['username'].strip()
         password = request.form['password'].strip()
+        limited = _account_limited(username, 'login.html')
+        if limited:
+            return limited
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            ok = _check_login(user, password)
+        except VerifierBusy:
+            return _verifier_busy('login.html')
+        if not ok:
+            consume('login', _account_key(username))
+        if ok:
             # log in as customer
             session['user_id'] = user.id
             session.pop('is_store_admin', None)
@@ -39,7 +102,8 @@ def login():
 
 @auth_bp.route('/store/register', methods=['GET','POST'])
 def store_register():
-    if Store.query.count() > 0:
+    # Single-database deployments host one store; sharded ones give each store its own file
+    if not tenancy.enabled() and Store.query.count() > 0:
         flash("Store signup closed.", "warning")
         return redirect(url_for('auth.store_login'))
 
@@ -54,11 +118,14 @@ def store_register():
         elif Store.query.filter_by(name=s).first():
             flash("Store name already exists.", "danger")
         else:
-            user = User(username=u, password_hash=generate_password_hash(p))
+            user = User(username=u, password_hash=hash_password(p))
             store = Store(name=s)
             store.admins.append(user)
             db.session.add_all([user, store])
             db.session.commit()
+            if tenancy.enabled():
+                tenancy.create_shard(store.id, db.metadata)
+            bump_catalog()
             session['user_id']        = user.id
             session['is_store_admin'] = True
             session['store_id']       = store.id
@@ -67,12 +134,28 @@ def store_register():
     return render_template('store_register.html')
 
 @auth_bp.route('/store/login', methods=['GET','POST'])
+@rate_limited('login', _login_keys, _login_limited('store_login.html'), methods=('POST',))
 def store_login():
     if request.method == 'POST':
         u = request.form['username'].strip()
         p = request.form['password'].strip()
-        user = User.query.filter_by(username=u).first()
-        if user and check_password_hash(user.password_hash, p) and user.stores:
+        limited = _account_limited(u, 'store_login.html')
+        if limited:
+            return limited
+        # Store membership comes back in the same query
+        user = (
+            User.query
+                .options(joinedload(User.stores))
+                .filter_by(username=u)
+                .first()
+        )
+        try:
+            ok = _check_login(user, p)
+        except VerifierBusy:
+            return _verifier_busy('store_login.html')
+        if not ok:
+            consume('login', _account_key(u))
+        if ok and user.stores:
             session['user_id']        = user.id
             session['is_store_admin'] = True
             session['store_id']       = user.stores[0].id
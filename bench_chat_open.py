@@ -0,0 +1,66 @@
+# bench_chat_open.py
+"""
+Session-open latency for /chat/<product_id>: first visit (creates the
+session and greeting) vs. returning visit, with SQL statements per request.
+Runs against a throw-away SQLite database.
+
+    python bench_chat_open.py [requests]
+"""
+import os
+import sys
+import time
+import statistics
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from app import create_app
+from models import db, User, Store, Product
+
+
+def main(n):
+    app = create_app({"TESTING": True})
+    with app.app_context():
+        db.create_all()
+        store = Store(name="Bench Store")
+        db.session.add(store)
+        db.session.flush()
+        users = [User(username=f"user{i}", password_hash=generate_password_hash("x"))
+                 for i in range(n)]
+        db.session.add_all(users)
+        db.session.add(Product(name="Widget", price=19.99, max_discount=2.0,
+                               description="A widget.", store_id=store.id))
+        db.session.commit()
+        user_ids = [u.id for u in users]
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda *a, **k: statements.append(1))
+
+    client = app.test_client()
+
+    def run(label):
+        times, queries = [], []
+        for uid in user_ids:
+            with client.session_transaction() as s:
+                s["user_id"] = uid
+            statements.clear()
+            t = time.perf_counter()
+            resp = client.get("/chat/1")
+            times.append(time.perf_counter() - t)
+            queries.append(len(statements))
+            assert resp.status_code == 200, resp.status_code
+        print(f"{label:<16} median {statistics.median(times) * 1000:6.2f} ms   "
+              f"p95 {sorted(times)[int(len(times) * 0.95)] * 1000:6.2f} ms   "
+              f"SQL/request {statistics.mean(queries):.1f}")
+
+    run("first visit")
+    run("returning visit")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
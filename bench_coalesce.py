@@ -0,0 +1,85 @@
+# bench_coalesce.py
+"""
+Concurrent sends to one chat while a model call is in flight, against a
+throw-away SQLite database with a slow stub model. Messages that arrive
+during the call get 202 and must be answered by the next round of the
+request holding the call; afterwards every user message has to be covered
+by an assistant reply that came after it.
+
+    python bench_coalesce.py [concurrent_sends] [model_delay_s]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import chat_routes
+from app import create_app
+from models import db, User, Store, Product, Message
+from passwords import hash_password
+
+DELAY = 0.5
+calls = []
+calls_lock = threading.Lock()
+
+
+def slow_model(provider, prompt, **kwargs):
+    with calls_lock:
+        calls.append(prompt)
+    time.sleep(DELAY)
+    return "It's made of recycled aluminium."
+
+
+chat_routes.call_model = slow_model
+
+
+def build():
+    app = create_app({
+        "TESTING": True,
+        "PASSWORD_VERIFY_WORKERS": 0,
+        "RATE_LIMITS": {"chat_send": (1e6, 1e6), "login": (1e6, 1e6)},
+    })
+    with app.app_context():
+        db.create_all()
+        store = Store(name="Bench Store")
+        db.session.add(store)
+        db.session.add(Product(name="Stand", price=19.99, max_discount=2.0,
+                               description="Adjustable stand.", store=store))
+        db.session.add(User(username="c", password_hash=hash_password("secret")))
+        db.session.commit()
+    return app
+
+
+if __name__ == "__main__":
+    sends = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    DELAY = float(sys.argv[2]) if len(sys.argv) > 2 else DELAY
+
+    app    = build()
+    client = app.test_client()
+    client.post("/login", data={"username": "c", "password": "secret"})
+    client.get("/chat/1")
+
+    def send(i):
+        time.sleep(i * DELAY / (2 * sends))     # later sends land mid-call
+        return client.post("/chat/1/send", json={"message": f"what is part {i} made of?"}).status_code
+
+    with ThreadPoolExecutor(max_workers=sends) as pool:
+        statuses = list(pool.map(send, range(sends)))
+
+    with app.app_context():
+        rows = Message.query.filter_by(session_id=1).order_by(Message.id).all()
+        last_reply = max(m.id for m in rows if m.role == 'assistant')
+        unanswered = [m.content for m in rows if m.role == 'user' and m.id > last_reply]
+        answered   = {text for prompt in calls for text in
+                      (f"what is part {i} made of?" for i in range(sends)) if text in prompt}
+    print(f"{sends} sends   statuses {statuses}   model calls {len(calls)}")
+    assert not unanswered, f"no reply after: {unanswered}"
+    assert len(answered) == sends, f"never sent to the model: {set(f'what is part {i} made of?' for i in range(sends)) - answered}"
+    assert len(calls) <= sends
+    print("every message answered")
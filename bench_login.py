@@ -0,0 +1,72 @@
+# bench_login.py
+"""
+Login throughput under the password hashing policy, against a throw-away
+SQLite database:
+
+  inline     verification on the request thread (PASSWORD_VERIFY_WORKERS=0)
+  pool       verification in the process pool, several concurrent clients
+  cached     repeat logins served from the verification cache
+
+    python bench_login.py [logins] [clients]
+"""
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app import create_app
+from models import db, User, Store
+from passwords import hash_password
+
+CORES = os.cpu_count() or 1
+
+
+def build(n, **config):
+    app = create_app({"TESTING": True, "RATE_LIMITS": {"login": (1e6, 1e6)}, **config})
+    with app.app_context():
+        db.create_all()
+        if not User.query.count():
+            pw = hash_password("secret")
+            store = Store(name="Bench Store")
+            for i in range(n):
+                user = User(username=f"user{i}", password_hash=pw)
+                store.admins.append(user)
+                db.session.add(user)
+            db.session.add(store)
+            db.session.commit()
+    return app
+
+
+def run(app, label, n, clients, cores, quiet=False):
+    def login(i):
+        client = app.test_client()
+        resp = client.post("/store/login", data={"username": f"user{i % n}", "password": "secret"})
+        assert resp.status_code == 302, resp.status_code
+
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(login, range(n)))
+    rate = n / (time.perf_counter() - t)
+    if not quiet:
+        print(f"{label:<30} {rate:8.1f} logins/s   {rate / cores:8.1f} per core")
+
+
+if __name__ == "__main__":
+    n       = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else CORES * 2
+
+    app = build(n, PASSWORD_VERIFY_WORKERS=0, PASSWORD_CACHE_TTL=0)
+    run(app, "inline, 1 client", n, 1, 1)
+
+    app = build(n, PASSWORD_VERIFY_WORKERS=CORES, PASSWORD_CACHE_TTL=0)
+    run(app, "warm-up", CORES, CORES, CORES, quiet=True)    # spawn the pool processes
+    run(app, f"pool x{CORES}, {clients} clients", n, clients, CORES)
+
+    app = build(n, PASSWORD_VERIFY_WORKERS=CORES, PASSWORD_CACHE_TTL=300)
+    run(app, "fill cache", n, clients, CORES, quiet=True)
+    run(app, f"cached, {clients} clients", n, clients, CORES)
@@ -0,0 +1,146 @@
+# bench_overload.py
+"""
+Overload simulation for load shedding, against a throw-away SQLite
+database with the model provider replaced by a local stub:
+
+  slow provider   every model call sleeps; many customers chat at once.
+                  Compared with shedding off, replies switch to canned
+                  answers once in-flight calls or latency cross the limits.
+  locked db       another connection holds the SQLite write lock; chat
+                  writes wait on it, the database signal trips and catalog
+                  pages answer 503 + Retry-After until the cooldown ends.
+
+    python bench_overload.py [customers] [provider_delay_s]
+"""
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import chat_routes
+import load_shed
+from app import create_app
+from models import db, User, Store, Product
+from passwords import hash_password
+
+DELAY = 0.5
+
+
+def slow_model(provider, prompt, **kwargs):
+    time.sleep(DELAY)
+    return "I can meet you at $18.99—does that work for you?"
+
+
+chat_routes.call_model = slow_model
+
+
+def build(customers, **config):
+    app = create_app({
+        "TESTING": True,
+        "PASSWORD_VERIFY_WORKERS": 0,
+        "RATE_LIMITS": {"chat_send": (1e6, 1e6), "login": (1e6, 1e6)},
+        **config,
+    })
+    with app.app_context():
+        db.create_all()
+        if not Store.query.count():
+            store = Store(name="Bench Store")
+            db.session.add(store)
+            db.session.add(Product(name="Stand", price=19.99, max_discount=2.0,
+                                   description="Adjustable stand.", store=store))
+            pw = hash_password("secret")
+            db.session.add_all(User(username=f"c{i}", password_hash=pw) for i in range(customers))
+            db.session.commit()
+    return app
+
+
+def customer_clients(app, customers):
+    clients = []
+    for i in range(customers):
+        client = app.test_client()
+        client.post("/login", data={"username": f"c{i}", "password": "secret"})
+        client.get("/chat/1")
+        clients.append(client)
+    return clients
+
+
+def chat_burst(app, clients, rounds=3):
+    sessions = {}
+    with app.app_context():
+        from models import ChatSession
+        for cs in ChatSession.query.filter_by(active=True):
+            sessions[cs.user_id] = cs.id
+    latencies, canned, errors = [], 0, 0
+    lock = threading.Lock()
+
+    def chat(i):
+        nonlocal canned, errors
+        client = clients[i % len(clients)]
+        with client.session_transaction() as s:
+            sid = sessions[s["user_id"]]
+        t = time.perf_counter()
+        resp = client.post(f"/chat/{sid}/send", json={"message": "can you do a better price?"})
+        with lock:
+            latencies.append(time.perf_counter() - t)
+            if resp.status_code >= 400:
+                errors += 1
+            elif (resp.get_json() or {}).get("degraded"):
+                canned += 1
+
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        list(pool.map(chat, range(len(clients) * rounds)))
+    return latencies, canned, errors
+
+
+def report(label, latencies, canned, errors):
+    lat = sorted(latencies)
+    p99 = lat[min(len(lat) - 1, int(len(lat) * .99))]
+    print(f"{label:<22} {len(lat):4d} sends   p50 {statistics.median(lat) * 1000:7.1f} ms"
+          f"   p99 {p99 * 1000:7.1f} ms   canned {canned:4d}   errors {errors}")
+
+
+def slow_provider(customers):
+    for label, config in (
+        ("shedding off",  {"SHED_MAX_MODEL_CALLS": 10 ** 6, "SHED_MODEL_LATENCY": 10 ** 6}),
+        ("shedding on",   {"SHED_MAX_MODEL_CALLS": max(1, customers // 4),
+                           "SHED_MODEL_LATENCY": DELAY / 2, "SHED_COOLDOWN": 5}),
+    ):
+        load_shed.provider.reset()
+        load_shed.database.reset()
+        app = build(customers, **config)
+        clients = customer_clients(app, customers)
+        report(label, *chat_burst(app, clients))
+
+
+def locked_db(customers, hold=1.5):
+    load_shed.provider.reset()
+    load_shed.database.reset()
+    app = build(customers, SHED_DB_WAIT=0.25, SHED_COOLDOWN=3)
+    clients = customer_clients(app, customers)
+    browser = app.test_client()
+
+    holder = sqlite3.connect(DB_PATH, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    threading.Timer(hold, holder.commit).start()
+    report(f"write lock {hold}s", *chat_burst(app, clients, rounds=1))
+
+    resp = browser.get("/stores")
+    print(f"{'catalog after lock':<22} HTTP {resp.status_code}   Retry-After {resp.headers.get('Retry-After')}")
+    time.sleep(load_shed.database.remaining() + 0.1)
+    print(f"{'catalog after cooldown':<22} HTTP {browser.get('/stores').status_code}")
+
+
+if __name__ == "__main__":
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    DELAY     = float(sys.argv[2]) if len(sys.argv) > 2 else DELAY
+
+    slow_provider(customers)
+    locked_db(customers)
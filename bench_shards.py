@@ -0,0 +1,85 @@
+# bench_shards.py
+"""
+Chat write throughput across several stores, single database vs one SQLite
+file per store (TENANT_SHARDING), against throw-away databases. Each worker
+process plays one store's customers and commits messages back to back,
+holding the write lock for `hold_ms` per transaction the way a request does
+between its first write and its commit. In the single-file run every store
+queues behind one write lock; sharded, stores only queue behind themselves.
+
+    python bench_shards.py [stores] [messages_per_store] [hold_ms]
+"""
+import os
+import sys
+import time
+import tempfile
+from multiprocessing import Process, Barrier
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+
+def make_app(root, sharded):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(root, 'directory.db')}"
+    from app import create_app
+    return create_app({"TESTING": True, "TENANT_SHARDING": sharded,
+                       "TENANT_SHARD_DIR": os.path.join(root, "shards")})
+
+
+def setup(root, sharded, stores):
+    from models import db, User, Store, Product, ChatSession
+    import tenancy
+    app = make_app(root, sharded)
+    with app.app_context():
+        tenancy.create_directory(db) if sharded else db.create_all()
+        user = User(username="bench", password_hash="x")
+        db.session.add(user)
+        for i in range(stores):
+            db.session.add(Store(name=f"Store {i}"))
+        db.session.commit()
+        for store_id in range(1, stores + 1):
+            if sharded:
+                tenancy.create_shard(store_id, db.metadata)
+            with tenancy.use_store(store_id):
+                product = Product(name="Stand", price=19.99, max_discount=2.0, store_id=store_id)
+                db.session.add(product)
+                db.session.flush()
+                db.session.add(ChatSession(user_id=user.id, product_id=product.id, current_price=19.99))
+                db.session.commit()
+
+
+def writer(root, sharded, store_id, n, hold, barrier):
+    from models import db, ChatSession, Message
+    import tenancy
+    app = make_app(root, sharded)
+    with app.app_context(), tenancy.use_store(store_id):
+        cs = ChatSession.query.join(ChatSession.product).filter_by(store_id=store_id).first()
+        barrier.wait()
+        for i in range(n):
+            db.session.add(Message(session_id=cs.id, role='user', content=f"offer {i}"))
+            db.session.flush()      # takes the write lock
+            time.sleep(hold)
+            db.session.commit()
+
+
+def run(label, sharded, stores, n, hold):
+    root = tempfile.mkdtemp()
+    setup(root, sharded, stores)
+    barrier = Barrier(stores + 1)
+    procs = [Process(target=writer, args=(root, sharded, s, n, hold, barrier)) for s in range(1, stores + 1)]
+    for p in procs:
+        p.start()
+    barrier.wait()
+    t = time.perf_counter()
+    for p in procs:
+        p.join()
+    rate = stores * n / (time.perf_counter() - t)
+    print(f"{label:<24} {rate:9.0f} commits/s")
+
+
+if __name__ == "__main__":
+    stores = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n      = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    hold   = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.002
+
+    run(f"single file, {stores} stores", False, stores, n, hold)
+    run(f"sharded, {stores} stores", True, stores, n, hold)
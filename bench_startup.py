@@ -0,0 +1,43 @@
+# bench_startup.py
+"""
+Cold-start benchmark: times `import model_adapters` and `import app` in fresh
+interpreters, plus the one-off cost of loading a provider SDK on first use.
+
+    python bench_startup.py [runs]
+"""
+import subprocess
+import sys
+import statistics
+
+SNIPPETS = {
+    "import model_adapters": (
+        "import time; from dotenv import load_dotenv; load_dotenv()\n"
+        "t = time.perf_counter(); import model_adapters\n"
+        "print(time.perf_counter() - t)"
+    ),
+    "import app": (
+        "import time\n"
+        "t = time.perf_counter(); import app\n"
+        "print(time.perf_counter() - t)"
+    ),
+    "first SDK load (openai)": (
+        "from dotenv import load_dotenv; load_dotenv()\n"
+        "import time, model_adapters\n"
+        "t = time.perf_counter(); model_adapters._openai()\n"
+        "print(time.perf_counter() - t)"
+    ),
+}
+
+
+def cold_time(code):
+    out = subprocess.run([sys.executable, "-c", code],
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for label, code in SNIPPETS.items():
+        times = [cold_time(code) for _ in range(runs)]
+        print(f"{label:<26} median {statistics.median(times) * 1000:8.1f} ms"
+              f"   min {min(times) * 1000:8.1f} ms   ({runs} runs)")
@@ -0,0 +1,99 @@
+# bench_workers.py
+"""
+Several worker processes against one SQLite database and one shared_state
+file, the way gunicorn runs wsgi:app with SHARED_STATE_URL=sqlite:///...
+Each worker builds its own app with create_app(), logs in its own customer
+and chats through the real routes (model replaced by a local stub), while
+also bumping a counter shared by every worker. Afterwards the row counts,
+notify versions and shared counter are checked against what was sent.
+
+    python bench_workers.py [workers] [messages_per_worker]
+"""
+import os
+import sys
+import time
+import tempfile
+from multiprocessing import Process, Barrier
+
+ROOT = tempfile.mkdtemp()
+os.environ["DATABASE_URL"]     = f"sqlite:///{os.path.join(ROOT, 'bench.db')}"
+os.environ["SHARED_STATE_URL"] = f"sqlite:///{os.path.join(ROOT, 'shared_state.db')}"
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import chat_routes
+from app import create_app
+from models import db, User, Store, Product, ChatSession, Message
+from passwords import hash_password
+from shared_state import get_backend, version
+
+chat_routes.call_model = lambda provider, prompt, **kwargs: "It's made of recycled aluminium."
+
+CONFIG = {
+    "TESTING": True,
+    "PASSWORD_VERIFY_WORKERS": 0,
+    "RATE_LIMITS": {"chat_send": (1e6, 1e6), "login": (1e6, 1e6)},
+}
+
+
+def setup(workers):
+    app = create_app(CONFIG)
+    with app.app_context():
+        db.create_all()
+        store = Store(name="Bench Store")
+        db.session.add(store)
+        db.session.add(Product(name="Stand", price=19.99, max_discount=2.0,
+                               description="Adjustable stand.", store=store))
+        pw = hash_password("secret")
+        db.session.add_all(User(username=f"w{i}", password_hash=pw) for i in range(workers))
+        db.session.commit()
+
+
+def worker(i, n, barrier):
+    app    = create_app(CONFIG)
+    client = app.test_client()
+    assert client.post("/login", data={"username": f"w{i}", "password": "secret"}).status_code == 302
+    assert client.get("/chat/1").status_code == 200
+    with app.app_context():
+        sid = ChatSession.query.join(User).filter(User.username == f"w{i}").one().id
+    barrier.wait()
+    for _ in range(n):
+        resp = client.post(f"/chat/{sid}/send", json={"message": "what is it made of?"})
+        assert resp.status_code == 200, (resp.status_code, resp.get_json())
+        with app.app_context():
+            get_backend().incr("bench:sends")
+
+
+def check(workers, n):
+    app = create_app(CONFIG)
+    with app.app_context():
+        sessions = ChatSession.query.all()
+        assert len(sessions) == workers, len(sessions)
+        for cs in sessions:
+            count = Message.query.filter_by(session_id=cs.id).count()
+            # greeting + (user message + reply) per send
+            assert count == 1 + 2 * n, (cs.id, count)
+            # one notify when the chat opened, then one per stored message
+            assert version(f"chat:{cs.id}") == 1 + 2 * n, (cs.id, version(f"chat:{cs.id}"))
+        assert get_backend().get("bench:sends") == workers * n
+        return Message.query.count()
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n       = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    setup(workers)
+    barrier = Barrier(workers + 1)
+    procs = [Process(target=worker, args=(i, n, barrier)) for i in range(workers)]
+    for p in procs:
+        p.start()
+    barrier.wait()
+    t = time.perf_counter()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t
+    assert all(p.exitcode == 0 for p in procs), [p.exitcode for p in procs]
+
+    rows = check(workers, n)
+    print(f"{workers} workers x {n} sends   {workers * n / elapsed:8.1f} sends/s   "
+          f"{rows} message rows, versions and shared counter consistent")
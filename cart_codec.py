@@ -0,0 +1,81 @@
+"""
+Compact cart encoding for the cookie session.
+
+A cart used to be a JSON list of {'product_id', 'price'} dicts (~40 bytes
+per item before signing). It is now packed as unsigned LEB128 varint
+pairs (product id, price in cents), zlib-compressed when that helps, and
+url-safe base64 encoded: ~5 characters per item for typical ids/prices.
+
+    <format byte> + payload
+        format 0: raw varint pairs
+        format 1: zlib(varint pairs)
+
+Carts are capped at CART_MAX_ITEMS so the cookie stays well under the
+browser's 4 KB limit. Undecodable values decode to an empty cart; legacy
+list-of-dict carts are still accepted by `decode`.
+"""
+import math
+import zlib
+import base64
+
+CART_MAX_ITEMS = 50
+
+_RAW, _ZLIB = 0, 1
+
+
+class CartFull(Exception):
+    """Adding the item would exceed CART_MAX_ITEMS."""
+
+
+def _varint(n, out):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _varints(data):
+    n = shift = 0
+    for byte in data:
+        n |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            yield n
+            n = shift = 0
+    if shift:
+        raise ValueError("truncated varint")
+
+
+def encode(items):
+    """[(product_id, price), ...] -> compact string; ids and prices must be finite and >= 0."""
+    if len(items) > CART_MAX_ITEMS:
+        raise CartFull()
+    out = bytearray()
+    for pid, price in items:
+        if pid < 0 or not math.isfinite(price) or price < 0:
+            raise ValueError(f"can't encode cart item ({pid}, {price})")
+        _varint(int(pid), out)
+        _varint(round(price * 100), out)
+    payload = bytes(out)
+    packed  = zlib.compress(payload, 9)
+    blob    = bytes([_ZLIB]) + packed if len(packed) < len(payload) else bytes([_RAW]) + payload
+    return base64.urlsafe_b64encode(blob).rstrip(b'=').decode('ascii')
+
+
+def decode(value):
+    """Compact string (or a legacy list of dicts) -> [(product_id, price), ...]."""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [(int(e['product_id']), float(e['price'])) for e in value][:CART_MAX_ITEMS]
+    try:
+        blob    = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        if blob[0] not in (_RAW, _ZLIB):
+            return []
+        payload = zlib.decompress(blob[1:]) if blob[0] == _ZLIB else blob[1:]
+        values  = list(_varints(payload))
+        if len(values) % 2:
+            return []
+        return [(pid, cents / 100) for pid, cents in zip(values[::2], values[1::2])][:CART_MAX_ITEMS]
+    except (ValueError, IndexError, TypeError, zlib.error):
+        return []
@@ -1,30 +1,71 @@
+import math
+from itertools import groupby
 from flask import Blueprint, session, redirect, url_for, flash, request, render_template
-from models import Product
+from models import db, Product, ChatSession, Deal
+import cart_codec
+import tenancy
+import live_board
+import analytics
 
 cart_bp = Blueprint('cart', __name__)
 
+
+def _load_cart():
+    return cart_codec.decode(session.get('cart'))
+
+
+def _save_cart(items):
+    session['cart'] = cart_codec.encode(items)
+
+
 @cart_bp.route('/cart/add', methods=['POST'])
 def add_to_cart():
-    pid = request.form.get('product_id')
-    price = request.form.get('price')
-    if not pid or not price:
+    pid = request.form.get('product_id', type=int)
+    price = request.form.get('price', type=float)
+    if pid is None or price is None:
         flash("Add to cart failed.", "danger")
-        return redirect(request.referrer or url_for('product.list_products'))
-    cart = session.get('cart', [])
-    cart.append({'product_id':int(pid), 'price':float(price)})
-    session['cart'] = cart
+        return redirect(request.referrer or url_for('store.list_stores'))
+    if not math.isfinite(price) or price < 0:
+        flash("Invalid price.", "danger")
+        return redirect(request.referrer or url_for('store.list_stores'))
+    with tenancy.use_store(tenancy.store_of(pid)):
+        product = Product.query.get(pid)
+        if not product:
+            flash("Add to cart failed.", "danger")
+            return redirect(request.referrer or url_for('store.list_stores'))
+        # Only the price negotiated in the customer's own live chat counts as a
+        # deal; any other posted price goes in the cart at list price
+        cs = None
+        if session.get('user_id'):
+            cs = ChatSession.query.filter_by(
+                user_id=session['user_id'], product_id=product.id, active=True
+            ).first()
+        negotiated = cs is not None and round(price, 2) == round(cs.current_price, 2)
+        price = cs.current_price if negotiated else product.price
+        cart = _load_cart()
+        try:
+            _save_cart(cart + [(product.id, price)])
+        except cart_codec.CartFull:
+            flash(f"Your cart is full ({cart_codec.CART_MAX_ITEMS} items).", "warning")
+            return redirect(url_for('cart.view_cart'))
+        # One deal per session, however many times it is added
+        if negotiated and not Deal.query.filter_by(session_id=cs.id).count():
+            analytics.record_deal(product, price, cs, session['user_id'])
+            db.session.commit()
+            if price < product.price:
+                live_board.deal_closed(product.store_id)
     flash("Added to cart.", "success")
     return redirect(url_for('cart.view_cart'))
 
 @cart_bp.route('/cart/remove', methods=['POST'])
 def remove_from_cart():
     idx = request.form.get('index')
-    cart = session.get('cart', [])
+    cart = _load_cart()
     try:
         i = int(idx)
         if 0 <= i < len(cart):
             cart.pop(i)
-            session['cart']=cart
+            _save_cart(cart)
             flash("Removed from cart.", "info")
     except:
         flash("Remove failed.", "danger")
@@ -32,11 +73,16 @@ def remove_from_cart():
 
 @cart_bp.route('/cart')
 def view_cart():
-    cart = session.get('cart', [])
+    cart = _load_cart()
+    products = {}
+    # One query per store the cart draws from (a single query when unsharded)
+    for store_id, pids in groupby(sorted({pid for pid, _ in cart}), key=tenancy.store_of):
+        with tenancy.use_store(store_id):
+            products.update((p.id, p) for p in Product.query.filter(Product.id.in_(list(pids))))
     items=[]; total=0.0
-    for e in cart:
-        p=Product.query.get(e['product_id'])
+    for pid, price in cart:
+        p=products.get(pid)
         if p:
-            items.append({'product':p,'price':e['price']})
-            total+=e['price']
+            items.append({'product':p,'price':price})
+            total+=price
     return render_template('cart.html', items=items, total=total)
@@ -1,12 +1,22 @@
 import os
-import re
+from types import SimpleNamespace
 from flask import (
     Blueprint, render_template, request,
     redirect, url_for, session, flash,
     jsonify, abort
 )
-from models import db, User, Product, ChatSession, Message
+from sqlalchemy.orm import joinedload
+from models import db, Product, ChatSession, Message
 from model_adapters import call_model
+from shared_state import get_backend, notify, version
+from rate_limit import rate_limited
+from archive import session_messages, ArchivedMessage
+import intent
+import negotiation
+import live_board
+import analytics
+import pricing
+import load_shed
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -16,56 +26,100 @@ def chat_page(product_id):
         flash("Please log in to negotiate.", "warning")
         return redirect(url_for('auth.login'))
 
-    user    = User.query.get_or_404(session['user_id'])
-    product = Product.query.get_or_404(product_id)
+    user_id = session['user_id']
 
-    # Find or create active ChatSession
-    cs = ChatSession.query.filter_by(
-        user_id=user.id,
-        product_id=product.id,
-        active=True
-    ).first()
-
-    if not cs:
-        # 1) Create session and add to DB
-        cs = ChatSession(
-            user_id=user.id,
-            product_id=product.id,
-            current_price=product.price
+    # Returning user: session, product and history in a single query
+    cs = (
+        ChatSession.query
+                   .options(joinedload(ChatSession.product),
+                            joinedload(ChatSession.messages))
+                   .filter_by(user_id=user_id, product_id=product_id, active=True)
+                   .first()
+    )
+    if cs:
+        return render_template(
+            'chat.html',
+            product=cs.product,
+            messages=cs.messages,
+            chat_session=cs,
+            current_price=cs.current_price,
+            version=version(f"chat:{cs.id}")
         )
-        db.session.add(cs)
-        # 2) Flush so that cs.id is assigned before we create the welcome message
-        db.session.flush()
 
-        # Initial greeting
-        greeting = (
-            f"Hello! I’m here to help you with **{product.name}**. "
-            f"Our list price is **${product.price:.2f}**—let me know any questions or what price you have in mind!"
-        )
-        # Use session_id now that cs.id is available
-        db.session.add(
-            Message(session_id=cs.id, role='assistant', content=greeting)
-        )
-        db.session.commit()
+    # First visit: session + greeting inserted in one transaction
+    product  = Product.query.get_or_404(product_id)
+    greeting = Message(role='assistant',
+                       content=negotiation.greeting(product.id, product.name, product.price))
+    cs = ChatSession(
+        user_id=user_id,
+        product_id=product.id,
+        current_price=product.price,
+        messages=[greeting]
+    )
+    db.session.add(cs)
+    analytics.record_session_opened(product.id)
+    db.session.flush()
 
-    # Load full chat history
-    messages = (
-        Message.query
-               .filter_by(session_id=cs.id)
-               .order_by(Message.timestamp)
-               .all()
+    # Copy out what the page needs and commit before rendering: the commit
+    # expires every loaded object, and rendering first would hold the SQLite
+    # write lock for the whole render.
+    page = dict(
+        product=SimpleNamespace(name=product.name, price=product.price),
+        messages=[ArchivedMessage(greeting.role, greeting.content, greeting.timestamp)],
+        chat_session=SimpleNamespace(id=cs.id),
+        current_price=cs.current_price,
     )
+    channel, store_id = f"chat:{cs.id}", product.store_id
+    db.session.commit()
+    notify(channel)
+    live_board.session_opened(store_id)
+    return render_template('chat.html', version=version(channel), **page)
+
 
-    return render_template(
-        'chat.html',
-        product=product,
-        messages=messages,
-        chat_session=cs,
-        current_price=cs.current_price
+# Messages that arrive while a model call for the same session is in flight
+# are stored and answered together by the next round of that call.
+INFLIGHT_TTL       = 60   # seconds; frees the slot if a worker dies mid-call
+MAX_REPLY_ROUNDS   = 3
+
+
+def _chat_limited(retry_after):
+    return jsonify({
+        'message': f"⚠️ You're sending messages too quickly. Please wait {retry_after}s."
+    }), 429
+
+
+def _answered_key(session_id):
+    return f"chat:answered:{session_id}"
+
+
+def _pending_user_messages(session_id):
+    """User messages newer than the last one a reply (AI, admin or system) has covered."""
+    # The cursor records the newest user message each AI reply consumed. "After
+    # the newest reply" isn't enough: messages posted during a model call get
+    # lower ids than the reply that call then stores.
+    answered = get_backend().get(_answered_key(session_id))
+    # Without a cursor (new session, or a memory backend that restarted) fall
+    # back to the newest assistant reply
+    roles = ('admin', 'system') if answered is not None else ('assistant', 'admin', 'system')
+    last_reply = (
+        db.session.query(db.func.max(Message.id))
+                  .filter(Message.session_id == session_id, Message.role.in_(roles))
+                  .scalar()
+    ) or 0
+    return (
+        Message.query
+               .filter(Message.session_id == session_id,
+                       Message.role == 'user',
+                       Message.id > max(answered or 0, last_reply))
+               .order_by(Message.id)
+               .all()
     )
 
 
 @chat_bp.route('/chat/<int:session_id>/send', methods=['POST'])
+@rate_limited('chat_send',
+              key_func=lambda session_id: f"{session.get('user_id')}:{session_id}",
+              on_limit=_chat_limited)
 def chat_send(session_id):
     if 'user_id' not in session:
         return jsonify({'message': "⚠️ Please log in first."}), 401
@@ -81,118 +135,91 @@ def chat_send(session_id):
     if not user_text:
         return jsonify({'message': ''})
 
-    # 1) Save user's message
+    # Overloaded: answer from the rules alone, user message and reply in one commit
+    if not cs.handed_to_human and load_shed.chat_degraded():
+        msg = Message(session_id=cs.id, role='user', content=user_text)
+        db.session.add(msg)
+        db.session.flush()
+        return jsonify(dict(_reply(cs, user_text, msg.id, degraded=True), degraded=True))
+
+    # 1) Save user's message (committed before any model call, so the
+    #    SQLite write lock isn't held while we wait on the provider)
     db.session.add(
         Message(session_id=cs.id, role='user', content=user_text)
     )
-    db.session.flush()
+    db.session.commit()
+    notify(f"chat:{cs.id}")
 
     # 2) If admin has taken over, just return current price
     if cs.handed_to_human:
-        db.session.commit()
         return jsonify({
             'message': None,
             'price':   f"{cs.current_price:.2f}"
         })
 
-    product     = cs.product
-    floor_price = round(product.price - product.max_discount, 2)
+    # 3) Answer everything pending in as few model calls as possible
+    backend  = get_backend()
+    inflight = f"chat:inflight:{cs.id}"
+    payload, status = {'message': None, 'queued': True}, 202
+    for _ in range(MAX_REPLY_ROUNDS):
+        if not backend.add(inflight, 1, ttl=INFLIGHT_TTL):
+            break   # another request is answering; it will pick our message up
+        try:
+            pending = _pending_user_messages(cs.id)
+            if pending and cs.active and not cs.handed_to_human:
+                payload = _reply(cs, "\n".join(m.content for m in pending), pending[-1].id)
+                status  = 200
+        finally:
+            backend.delete(inflight)
+        # Re-check after releasing: a message queued during our call is ours to answer
+        if cs.handed_to_human or not _pending_user_messages(cs.id):
+            break
 
-    # 3) If at floor price already, inform politely
-    if cs.current_price <= floor_price:
-        floor_msg = (
-            f"I'm truly sorry, but **${floor_price:.2f}** is the best price for **{product.name}**. "
-            "Please click Add to Cart if you’d like to proceed."
-        )
-        db.session.add(
-            Message(session_id=cs.id, role='assistant', content=floor_msg)
-        )
-        cs.current_price = floor_price
-        db.session.commit()
-        return jsonify({
-            'message': floor_msg,
-            'price':   f"{cs.current_price:.2f}"
-        })
+    payload.setdefault('price', f"{cs.current_price:.2f}")
+    return jsonify(payload), status
 
-    # 4) Detect discount request
-    asked_discount = bool(
-        re.search(r'\b(discount|lower|cheaper|price|deal)\b',
-                  user_text, re.IGNORECASE)
-    )
 
-    # 5) Info mode (no discount)
-    if not asked_discount:
-        system_prompt = (
-            "You’re a friendly sales assistant. "
-            "Answer product questions warmly—and do NOT offer a discount unless explicitly asked.\n\n"
-            f"Product: {product.name}\n"
-            f"Description: {product.description}\n"
-            f"Current Price: ${cs.current_price:.2f}\n"
-        )
-        convo = [{"role": "system", "content": system_prompt}]
-        for m in Message.query.filter_by(session_id=cs.id).order_by(Message.timestamp):
-            role = 'assistant' if m.role in ('assistant','admin') else 'user'
-            convo.append({"role": role, "content": m.content})
-        convo.append({"role": "user", "content": user_text})
+def _reply(cs, user_text, upto_id, degraded=False):
+    """
+    Produce, store and return one assistant reply to the pending user text,
+    which covers user messages up to and including `upto_id`.
+    """
+    provider = os.getenv("MODEL_PROVIDER", "openai")
+    quote    = pricing.quote(cs.product)
 
-        provider = os.getenv("MODEL_PROVIDER", "openai")
-        try:
-            prompt_text = "\n".join(m["content"] for m in convo)
-            bot_text    = call_model(provider, prompt_text)
-        except Exception:
-            bot_text = "⚠️ Sorry, something went wrong. Please try again shortly."
+    def call(prompt):
+        with load_shed.model_call():
+            return call_model(provider, prompt)
 
-        db.session.add(
-            Message(session_id=cs.id, role='assistant', content=bot_text)
-        )
-        db.session.commit()
-        return jsonify({'message': bot_text})
-
-    # 6) Negotiation mode
-    system_prompt = (
-        "You’re a warm, human‐like sales assistant negotiating step by step.\n\n"
-        f"Product: {product.name}\n"
-        f"Description: {product.description}\n"
-        f"Current Price: ${cs.current_price:.2f}\n"
-        f"Floor Price: ${floor_price:.2f}\n\n"
-        "GUIDELINES:\n"
-        "1. First offer: small (~5%) off current price, above floor.\n"
-        "2. Phrase naturally: “I can meet you at $X.XX—does that work for you?”\n"
-        "3. If pressed again, step down until floor.\n"
-        "4. At floor: “I’m sorry, but $<floor> is the best I can do.”\n"
-        "5. If admin override appears, use that price silently.\n"
-        "6. Keep it warm and natural.\n"
+    turn = negotiation.respond(
+        cs.product,
+        cs.current_price,
+        [(m.role, m.content) for m in cs.messages] if not degraded else [],
+        user_text,
+        None if degraded else call,
+        floor=quote.floor,
+        step=quote.step
     )
-    convo = [{"role": "system", "content": system_prompt}]
-    for m in Message.query.filter_by(session_id=cs.id).order_by(Message.timestamp):
-        role = 'assistant' if m.role in ('assistant','admin') else 'user'
-        convo.append({"role": role, "content": m.content})
-    convo.append({"role": "user", "content": user_text})
-
-    provider = os.getenv("MODEL_PROVIDER", "openai")
-    try:
-        prompt_text = "\n".join(m["content"] for m in convo)
-        bot_text    = call_model(provider, prompt_text)
-    except Exception:
-        bot_text = "⚠️ Error reaching the model—please try again."
 
     db.session.add(
-        Message(session_id=cs.id, role='assistant', content=bot_text)
+        Message(session_id=cs.id, role='assistant', content=turn.message)
     )
-
-    # Clamp any price offered in the AI text
-    match = re.search(r'\$([0-9]+(?:\.[0-9]{1,2})?)', bot_text)
-    if match:
-        offered = float(match.group(1))
-        cs.current_price = round(
-            max(floor_price, min(offered, cs.current_price)), 2
-        )
-
+    product, old_price = cs.product, cs.current_price
+    cs.current_price = turn.price
+    if turn.handoff:
+        cs.handed_to_human = True
     db.session.commit()
-    return jsonify({
-        'message': bot_text,
+    get_backend().update(_answered_key(cs.id), lambda prev: max(prev or 0, upto_id))
+    notify(f"chat:{cs.id}")
+
+    if turn.price != old_price:
+        live_board.price_changed(product.store_id, product.price, old_price, turn.price)
+    if turn.handoff:
+        live_board.handed_off(product.store_id)
+    return {
+        'message': turn.message,
         'price':   f"{cs.current_price:.2f}"
-    })
+    }
 
 
 @chat_bp.route('/chat/<int:session_id>/messages')
@@ -201,17 +228,26 @@ def chat_messages(session_id):
     if session.get('user_id') != cs.user_id:
         return jsonify({'error': 'unauthorized'}), 403
 
+    # Nothing written since the client's last poll: skip the transcript query
+    current = version(f"chat:{cs.id}")
+    if request.args.get('v', type=int) == current:
+        return jsonify({'unchanged': True, 'version': current})
+
     # Apply any admin override in transcript
-    msgs = Message.query.filter_by(session_id=cs.id).order_by(Message.timestamp).all()
+    msgs = session_messages(cs)
+    old_price  = cs.current_price
     overridden = False
     for m in msgs:
         if m.role == 'admin':
-            mo = re.search(r'\$([0-9]+(?:\.[0-9]{1,2})?)', m.content)
+            mo = intent.PRICE_RE.search(m.content)
             if mo:
                 cs.current_price = round(float(mo.group(1)), 2)
                 overridden = True
-    if overridden:
+    if overridden and cs.current_price != old_price:
+        product = cs.product
+        new_price = cs.current_price
         db.session.commit()
+        live_board.price_changed(product.store_id, product.price, old_price, new_price)
 
     # Only show user + assistant messages to the customer
     visible = [
@@ -221,5 +257,6 @@ def chat_messages(session_id):
 
     return jsonify({
         'messages': visible,
-        'price':    f"{cs.current_price:.2f}"
+        'price':    f"{cs.current_price:.2f}",
+        'version':  current
     })
@@ -0,0 +1,171 @@
+"""
+HTTP caching for catalog pages and static assets.
+
+Catalog pages (landing page, store list, product lists) carry an ETag built
+from the catalog version, the deploy's template/static fingerprint, the
+path and the few session fields the navbar depends on. A repeat visitor
+revalidates with If-None-Match and gets a 304 before any DB query or
+template render. Writers call `bump_catalog()` after changing stores or
+products; the version lives in the shared_state backend so every worker
+sees it.
+
+Pages with pending flash messages are never cached (they render once).
+
+Static files are linked as /static/<file>?v=<content hash> and served
+with a one-year immutable max-age when the hash matches.
+
+Config:
+    CATALOG_FRAGMENT_CACHE   rendered catalog pages kept per worker, keyed
+                             by ETag, so first-time visitors skip the render
+                             too (default 0: off)
+    STATIC_MAX_AGE           max-age for fingerprinted static files
+                             (default one year)
+"""
+import os
+import uuid
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import current_app, request, session, make_response
+from werkzeug.security import safe_join
+from shared_state import get_backend, notify, version
+
+CATALOG_CHANNEL = 'catalog'
+STATIC_MAX_AGE  = 365 * 24 * 3600
+
+_fragments      = OrderedDict()
+_fragments_lock = threading.Lock()
+_static_hashes  = {}
+
+
+def _tree_hash(*dirs):
+    """Digest of every file under the given directories (computed once per worker)."""
+    digest = hashlib.sha1()
+    for root_dir in dirs:
+        for root, subdirs, files in os.walk(root_dir):
+            subdirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(path[len(root_dir):].encode('utf-8'))
+                with open(path, 'rb') as fh:
+                    digest.update(fh.read())
+    return digest.hexdigest()[:12]
+
+
+# ─── Catalog version ────────────────────────────
+def bump_catalog():
+    notify(CATALOG_CHANNEL)
+
+
+def catalog_version():
+    backend = get_backend()
+    # The epoch keeps ETags from colliding if a memory backend restarts at version 0
+    epoch = backend.get('catalog:epoch')
+    if epoch is None:
+        backend.add('catalog:epoch', uuid.uuid4().hex[:8])
+        epoch = backend.get('catalog:epoch')
+    return f"{epoch}.{version(CATALOG_CHANNEL)}"
+
+
+def _etag():
+    parts = (
+        current_app.extensions['http_cache_build'],
+        catalog_version(),
+        request.full_path,
+        session.get('user_id'),
+        session.get('is_store_admin'),
+        session.get('store_id'),
+    )
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+# ─── Rendered-page cache ────────────────────────
+def _cached_body(etag):
+    with _fragments_lock:
+        body = _fragments.get(etag)
+        if body is not None:
+            _fragments.move_to_end(etag)
+        return body
+
+
+def _store_body(etag, body, size):
+    with _fragments_lock:
+        _fragments[etag] = body
+        _fragments.move_to_end(etag)
+        while len(_fragments) > size:
+            _fragments.popitem(last=False)
+
+
+def catalog_page(view):
+    """Conditional-GET (and optional render caching) for a catalog view."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get('_flashes'):
+            response = make_response(view(*args, **kwargs))
+            response.cache_control.no_store = True
+            return response
+
+        etag = _etag()
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            size = current_app.config.get('CATALOG_FRAGMENT_CACHE', 0)
+            body = _cached_body(etag) if size else None
+            if body is not None:
+                response = make_response(body)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if size and response.status_code == 200:
+                    _store_body(etag, response.get_data(), size)
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        response.cache_control.private  = True
+        response.cache_control.no_cache = True   # always revalidate; the ETag makes that cheap
+        response.vary.add('Cookie')
+        return response
+    return wrapper
+
+
+# ─── Fingerprinted static files ─────────────────
+def _static_hash(app, filename):
+    path = safe_join(app.static_folder, filename)
+    if path is None:
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _static_hashes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as fh:
+        digest = hashlib.sha1(fh.read()).hexdigest()[:10]
+    _static_hashes[path] = (mtime, digest)
+    return digest
+
+
+def init_app(app):
+    app.extensions['http_cache_build'] = _tree_hash(
+        os.path.join(app.root_path, app.template_folder), app.static_folder
+    )
+
+    @app.url_defaults
+    def _fingerprint_static(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = _static_hash(app, values['filename'])
+            if digest:
+                values['v'] = digest
+
+    @app.after_request
+    def _static_cache_headers(response):
+        if request.endpoint == 'static' and response.status_code in (200, 304):
+            v = request.args.get('v')
+            if v and v == _static_hash(app, request.view_args.get('filename', '')):
+                response.cache_control.no_cache  = None
+                response.cache_control.public    = True
+                response.cache_control.max_age   = app.config.get('STATIC_MAX_AGE', STATIC_MAX_AGE)
+                response.cache_control.immutable = True
+        return response
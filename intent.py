@@ -0,0 +1,186 @@
+"""
+Intent classification for customer chat messages.
+
+chat_send uses this to decide which messages need the negotiation prompt,
+which can use the cheaper info prompt, and which get a canned reply with
+no model call at all.
+
+    classify("I'll give you $8.50")  ->  Intent('counter_offer', 8.5)
+
+Precompiled high-precision patterns are tried first. Anything they don't
+catch goes to a small multinomial naive Bayes model over hashed word
+uni/bigrams, trained on intent_corpus.jsonl the first time it is needed.
+"""
+import os
+import json
+import math
+import re
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+
+DISCOUNT      = 'discount'
+COUNTER_OFFER = 'counter_offer'
+PURCHASE      = 'purchase'
+HANDOFF       = 'handoff'
+INFO          = 'info'
+LABELS        = (DISCOUNT, COUNTER_OFFER, PURCHASE, HANDOFF, INFO)
+
+Intent = namedtuple('Intent', 'label amount')
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_corpus.jsonl')
+
+# First dollar amount in a piece of text (assistant offers, admin overrides)
+PRICE_RE = re.compile(r'\$\s?([0-9]+(?:\.[0-9]{1,2})?)')
+
+# Amounts a customer writes: "$8.50", "8.50 dollars", "8 bucks"
+_AMOUNT_RE   = re.compile(
+    r'\$\s?([0-9]+(?:\.[0-9]{1,2})?)|\b([0-9]+(?:\.[0-9]{1,2})?)\s*(?:dollars?|bucks|usd)\b',
+    re.IGNORECASE
+)
+# A handoff is permanent (the AI stops answering the chat), so it takes a
+# sentence that is nothing but a request for a person: "Can I talk to a
+# human?", "Connect me to support please". Questions that merely mention
+# people ("Is there anyone who has reviewed it?") go to the model.
+_PEOPLE      = (
+    r"(?:a |an |the |your |some |someone from )?"
+    r"(?:human(?: being)?|(?:real |live )?person|someone(?: real| in charge)?|(?:live |support )?agent|"
+    r"customer (?:service|support)(?: agent)?|representative|manager|staff(?: member)?|employee|"
+    r"store owner|support(?: team)?)"
+)
+_HANDOFF_RE  = re.compile(
+    r"^(?:(?:ok|okay|no|hi|hello|please)[,!]? )*(?:"
+    r"(?:(?:can|could|may) i |i (?:want|need|would like|'?d like) to |let me |i'?d rather )?"
+    r"(?:talk|speak|chat) (?:to|with) " + _PEOPLE + r"|"
+    r"(?:can you )?(?:connect|transfer|put) me (?:through )?(?:to|with) " + _PEOPLE + r"|"
+    r"(?:i want|i need|i'?d like|get me|give me) " + _PEOPLE + r"|"
+    r"(?:can|could) " + _PEOPLE + r" (?:help(?: me)?|answer this|take over|join)|"
+    r"(?:is|are) (?:there )?(?:anyone|someone|" + _PEOPLE + r")(?: from (?:the store|support|your team))?"
+    r"(?: available| there)?|"
+    r"i (?:don'?t|do not) want to (?:talk|chat|speak) (?:to|with) a bot|"
+    r"(?:a )?(?:human|real person|live agent|agent|representative)|"
+    r"escalate(?: this| it)?"
+    r")(?:,? (?:please|now|instead))*$",
+    re.IGNORECASE
+)
+_SENTENCE_RE = re.compile(r"\s*[.!?]+\s*")
+_OFFER_RE    = re.compile(
+    r"\b(pay|offer|how about|what about|would you (?:take|accept|do)|will you (?:take|accept|do)|"
+    r"can you do|could you do|i can do|give you|take it for|settle for|meet (?:me )?at|"
+    r"go up to|budget|we have a deal|let'?s (?:do|say))\b",
+    re.IGNORECASE
+)
+_DISCOUNT_RE = re.compile(
+    r"\b(discount|cheaper|lower|coupon|promo|reduce|knock (?:some|a bit|it) off|"
+    r"(?:a|any|better) deal|best price|too (?:expensive|much|pricey|high|steep|costly)|"
+    r"(?:a bit|quite|pretty|rather|very|so) (?:expensive|pricey|steep)|price is (?:high|steep)|"
+    r"can'?t afford|(?:over|out of) my (?:budget|price range)|any (?:sale|offer)s?|bargain|"
+    r"drop (?:it|the price)|overpriced|wiggle room)\b",
+    re.IGNORECASE
+)
+# First-person or imperative buying only: "Is the charger sold separately?",
+# "I'll get back to you" and "I'm in Canada" are not purchases
+_PURCHASE_RE = re.compile(
+    r"\b(?:i(?:'?ll| will)|i'?d like to|i want to|i'?m (?:ready|going) to|let'?s) "
+    r"(?:buy|purchase|order|check ?out)\b|"
+    r"\bi(?:'?ll| will) (?:take|grab) (?:it|one|two|this|that)\b|"
+    r"\b(?:how|where) do i (?:pay|check ?out)\b|"
+    r"\b(?:add(?:ing)? (?:it |this |one )?to (?:my |the )?cart|"
+    r"place (?:an |the |my )?order|go ahead with (?:the |my )?(?:purchase|order)|i'?m buying|"
+    r"it'?s a deal|ring it up|count me in|i accept|let'?s proceed|"
+    r"(?:you'?ve )?(?:sold|convinced) me)\b|"
+    r"\bdeal!|"
+    r"^\W*(?:(?:ok|okay|fine|great|perfect|yes)[,!]? )?"
+    r"(?:sold|check ?out|deal|sounds good|that works(?: for me)?|i'?m in|i'?ll get it|buy it|order it)\W*$",
+    re.IGNORECASE
+)
+
+_TOKEN_RE   = re.compile(r"[a-z']+|[0-9]+(?:\.[0-9]+)?")
+N_FEATURES  = 1 << 12
+
+
+def _features(text):
+    """Hashed word unigram + bigram ids; numbers collapse to one token."""
+    tokens = ['<num>' if t[0].isdigit() else t for t in _TOKEN_RE.findall(text.lower())]
+    grams  = tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(g.encode('utf-8')) & (N_FEATURES - 1) for g in grams]
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes over hashed n-gram features, Laplace-smoothed."""
+
+    def __init__(self, examples):
+        counts = {label: {} for label in LABELS}
+        docs   = dict.fromkeys(LABELS, 0)
+        for text, label in examples:
+            docs[label] += 1
+            bucket = counts[label]
+            for f in _features(text):
+                bucket[f] = bucket.get(f, 0) + 1
+        total_docs = sum(docs.values())
+        self.log_prior = {
+            label: math.log((docs[label] + 1) / (total_docs + len(LABELS)))
+            for label in LABELS
+        }
+        # Precompute log-likelihoods so prediction is a handful of dict lookups
+        self.log_like   = {}
+        self.log_unseen = {}
+        for label, bucket in counts.items():
+            denom = sum(bucket.values()) + N_FEATURES
+            self.log_like[label]   = {f: math.log((c + 1) / denom) for f, c in bucket.items()}
+            self.log_unseen[label] = math.log(1 / denom)
+
+    def predict(self, text):
+        feats = _features(text)
+        best, best_score = INFO, -math.inf
+        for label in LABELS:
+            like, unseen = self.log_like[label], self.log_unseen[label]
+            score = self.log_prior[label] + sum(like.get(f, unseen) for f in feats)
+            if score > best_score:
+                best, best_score = label, score
+        return best
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding='utf-8') as fh:
+        return [(row['text'], row['label']) for row in map(json.loads, fh) if row]
+
+
+@lru_cache(maxsize=None)
+def _model():
+    return NaiveBayes(load_corpus())
+
+
+def parse_amount(text):
+    m = _AMOUNT_RE.search(text)
+    if not m:
+        return None
+    return round(float(m.group(1) or m.group(2)), 2)
+
+
+def wants_person(text):
+    """Whether some sentence of `text` is an explicit request for a person."""
+    return any(_HANDOFF_RE.match(sentence) for sentence in _SENTENCE_RE.split(text.strip()))
+
+
+def classify(text, model=None):
+    amount = parse_amount(text)
+
+    if wants_person(text):
+        return Intent(HANDOFF, None)
+    if amount is not None and _OFFER_RE.search(text):
+        return Intent(COUNTER_OFFER, amount)
+    if _DISCOUNT_RE.search(text):
+        return Intent(DISCOUNT, amount)
+    if amount is None and _PURCHASE_RE.search(text):
+        return Intent(PURCHASE, None)
+
+    label = (model or _model()).predict(text)
+    if label in (HANDOFF, PURCHASE) and amount is None:
+        # Canned handoff/purchase replies need a pattern match; let the model answer
+        label = INFO
+    elif amount is not None and label in (DISCOUNT, PURCHASE, HANDOFF):
+        label = COUNTER_OFFER          # "$10 and we have a deal"
+    elif amount is None and label == COUNTER_OFFER:
+        label = DISCOUNT
+    return Intent(label, amount if label in (COUNTER_OFFER, DISCOUNT) else None)
@@ -0,0 +1,105 @@
+"""
+Live per-store session board.
+
+Counters are kept in the shared_state backend and updated as chat events
+happen, so the dashboard can poll /store/board.json without touching the
+session tables. The first read for a store (or after the backend is reset)
+seeds the counters from the DB once; events arriving before that are
+ignored because the seed already counts them.
+
+Counters per store:
+    active_ai        active sessions still handled by the AI
+    human            active sessions handed to a human
+    discount_total   sum over sessions of (list price - current price)
+    discounted       sessions currently below list price
+    deals_closed     orders placed plus negotiated prices added to cart
+"""
+from sqlalchemy import case, func
+from models import db, ChatSession, Product, Order, Deal
+from shared_state import get_backend
+
+COUNTERS = ('active_ai', 'human', 'discount_total', 'discounted', 'deals_closed')
+
+
+def _key(store_id, name):
+    return f"board:{store_id}:{name}"
+
+
+def _bump(store_id, **deltas):
+    backend = get_backend()
+    if not backend.get(_key(store_id, 'ready')):
+        return
+    for name, delta in deltas.items():
+        if delta:
+            backend.incr(_key(store_id, name), delta)
+
+
+# ─── Events ─────────────────────────────────────
+def session_opened(store_id):
+    _bump(store_id, active_ai=1)
+
+
+def handed_off(store_id):
+    _bump(store_id, active_ai=-1, human=1)
+
+
+def session_ended(store_id, was_human):
+    _bump(store_id, **{'human' if was_human else 'active_ai': -1})
+
+
+def price_changed(store_id, list_price, old_price, new_price):
+    old_disc = max(0.0, list_price - old_price)
+    new_disc = max(0.0, list_price - new_price)
+    _bump(store_id,
+          discount_total=round(new_disc - old_disc, 2),
+          discounted=(new_disc > 0) - (old_disc > 0))
+
+
+def deal_closed(store_id):
+    _bump(store_id, deals_closed=1)
+
+
+# ─── Reads ──────────────────────────────────────
+def rebuild(store_id):
+    """Recompute every counter for one store from the DB."""
+    discount = func.max(Product.price - ChatSession.current_price, 0)
+    row = (
+        db.session.query(
+            func.sum(case((ChatSession.active & ~ChatSession.handed_to_human, 1), else_=0)),
+            func.sum(case((ChatSession.active & ChatSession.handed_to_human, 1), else_=0)),
+            func.sum(discount),
+            func.sum(case((discount > 0, 1), else_=0)),
+        )
+        .select_from(ChatSession).join(Product)
+        .filter(Product.store_id == store_id)
+        .one()
+    )
+    # deal_closed() fires for a cart add below list price, so count those deals too
+    negotiated = (
+        Deal.query.join(Product)
+            .filter(Product.store_id == store_id, Deal.price < Deal.list_price)
+            .count()
+    )
+    closed = Order.query.filter_by(store_id=store_id).count() + negotiated
+    values = dict(zip(COUNTERS, [row[0] or 0, row[1] or 0, round(row[2] or 0.0, 2), row[3] or 0, closed]))
+
+    backend = get_backend()
+    for name, value in values.items():
+        backend.set(_key(store_id, name), value)
+    backend.set(_key(store_id, 'ready'), True)
+    return values
+
+
+def snapshot(store_id):
+    backend = get_backend()
+    if not backend.get(_key(store_id, 'ready')):
+        values = rebuild(store_id)
+    else:
+        values = {name: backend.get(_key(store_id, name), 0) for name in COUNTERS}
+    discounted = values['discounted']
+    return {
+        'active_ai_sessions': values['active_ai'],
+        'human_sessions':     values['human'],
+        'avg_discount':       round(values['discount_total'] / discounted, 2) if discounted else 0.0,
+        'deals_closed':       values['deals_closed'],
+    }
@@ -0,0 +1,139 @@
+"""
+Load shedding when the model provider or the database is overloaded.
+
+Two signals are tracked per worker process:
+
+  provider   calls currently waiting on the model provider, and their
+             smoothed latency
+  database   smoothed time of SQL statements, which includes waiting for the
+             SQLite write lock (busy_timeout) and failures after that wait
+
+When a smoothed value crosses its threshold the signal trips for
+SHED_COOLDOWN seconds, then measurement starts fresh. While tripped:
+
+  * chat_send answers from the negotiation rules alone (current price, floor
+    message, checkout) with no model call, and writes the user's message and
+    the reply in a single commit;
+  * views marked @shed_when_busy return 503 with Retry-After while the
+    database signal is tripped.
+
+Config:
+    SHED_MAX_MODEL_CALLS   in-flight model calls per worker before chat
+                           replies are canned (default 16)
+    SHED_MODEL_LATENCY     smoothed model-call seconds that trips (default 20)
+    SHED_DB_WAIT           smoothed SQL statement seconds that trips (default 2)
+    SHED_COOLDOWN          seconds a tripped signal stays on (default 15)
+"""
+import math
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, has_app_context, make_response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ALPHA = 0.3   # weight of the newest sample in the moving average
+
+
+class _Signal:
+    """Exponentially smoothed latency that trips above a threshold."""
+
+    def __init__(self):
+        self.value = None
+        self.until = 0.0
+        self.lock  = threading.Lock()
+
+    def record(self, seconds, threshold, cooldown):
+        with self.lock:
+            self.value = seconds if self.value is None else ALPHA * seconds + (1 - ALPHA) * self.value
+            if self.value > threshold:
+                self.until = time.time() + cooldown
+                self.value = None
+
+    def remaining(self):
+        return max(0.0, self.until - time.time())
+
+    def reset(self):
+        with self.lock:
+            self.value, self.until = None, 0.0
+
+
+provider = _Signal()
+database = _Signal()
+
+_inflight      = 0
+_inflight_lock = threading.Lock()
+
+
+def _config(name, default):
+    return current_app.config.get(name, default)
+
+
+# ─── Model calls ────────────────────────────────
+@contextmanager
+def model_call():
+    """Wrap one provider call so it counts as in flight and feeds the latency signal."""
+    global _inflight
+    with _inflight_lock:
+        _inflight += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _inflight_lock:
+            _inflight -= 1
+        provider.record(time.perf_counter() - start,
+                        _config('SHED_MODEL_LATENCY', 20), _config('SHED_COOLDOWN', 15))
+
+
+def model_calls_in_flight():
+    return _inflight
+
+
+# ─── SQL statement timing ───────────────────────
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('shed_started', []).append(time.perf_counter())
+
+
+def _record_db(conn):
+    started = conn.info.get('shed_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if has_app_context():
+        database.record(elapsed, _config('SHED_DB_WAIT', 2), _config('SHED_COOLDOWN', 15))
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_db(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _on_error(context):
+    if context.connection is not None:
+        _record_db(context.connection)
+
+
+# ─── Decisions ──────────────────────────────────
+def chat_degraded():
+    """True when chat replies should skip the model."""
+    return bool(
+        provider.remaining() or database.remaining()
+        or _inflight >= _config('SHED_MAX_MODEL_CALLS', 16)
+    )
+
+
+def shed_when_busy(view):
+    """503 + Retry-After for a non-critical view while the database is overloaded."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        wait = database.remaining()
+        if wait:
+            resp = make_response("We're very busy right now. Please try again shortly.", 503)
+            resp.headers['Retry-After'] = str(math.ceil(wait))
+            return resp
+        return view(*args, **kwargs)
+    return wrapper
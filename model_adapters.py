@@ -1,27 +1,11 @@
 import os
 import json
 import subprocess
-import openai
+from functools import lru_cache
 
-# ─── OPTIONAL: Claude/Anthropic ────────────────────────────────────────────────
-try:
-    from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
-except ImportError:
-    Anthropic = None
-    HUMAN_PROMPT = None
-    AI_PROMPT = None
-
-# ─── OPTIONAL: Google Gemini/PaLM ──────────────────────────────────────────────
-try:
-    from google.cloud import aiplatform
-    from google.oauth2 import service_account
-except ImportError:
-    aiplatform = None
-    service_account = None
-
-# ─── Groq import and client init ───────────────────────────────────────────────
-from groq import Groq
-groq_client = Groq()
+# Provider SDKs are imported lazily on first use: pulling in openai, groq,
+# anthropic and google.cloud.aiplatform at import time dominated worker boot
+# and script start-up even when only one provider is ever called.
 
 # ────────────────────────────────────────────────────────────────────────────────
 #    Configuration from ENV
@@ -30,18 +14,47 @@ OPENAI_API_KEY      = os.getenv("OPENAI_API_KEY", "").strip()
 ANTHROPIC_API_KEY   = os.getenv("CLAUDE_API_KEY", "").strip()
 GOOGLE_CREDENTIALS  = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "").strip()
 
+
 # ─── Init OpenAI ────────────────────────────────────────────────────────────────
-openai.api_key = OPENAI_API_KEY
-if not openai.api_key:
-    print("⚠️ Missing OPENAI_API_KEY – OpenAI calls will fail if used.")
+@lru_cache(maxsize=None)
+def _openai():
+    import openai
+    openai.api_key = OPENAI_API_KEY
+    if not openai.api_key:
+        print("⚠️ Missing OPENAI_API_KEY – OpenAI calls will fail if used.")
+    return openai
+
 
-# ─── Init Anthropic ─────────────────────────────────────────────────────────────
-if Anthropic and not ANTHROPIC_API_KEY:
-    print("⚠️ Missing CLAUDE_API_KEY – Claude calls will fail if used.")
+# ─── Groq client (fallback Llama) ───────────────────────────────────────────────
+@lru_cache(maxsize=None)
+def _groq_client():
+    from groq import Groq
+    return Groq()
 
-# ─── Init Vertex AI (Gemini) ────────────────────────────────────────────────────
-if aiplatform and not GOOGLE_CREDENTIALS:
-    print("⚠️ Missing GOOGLE_APPLICATION_CREDENTIALS – Gemini calls will fail if used.")
+
+# ─── OPTIONAL: Claude/Anthropic ────────────────────────────────────────────────
+@lru_cache(maxsize=None)
+def _anthropic():
+    try:
+        from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
+    except ImportError:
+        return None, None, None
+    if not ANTHROPIC_API_KEY:
+        print("⚠️ Missing CLAUDE_API_KEY – Claude calls will fail if used.")
+    return Anthropic, HUMAN_PROMPT, AI_PROMPT
+
+
+# ─── OPTIONAL: Google Gemini/PaLM ──────────────────────────────────────────────
+@lru_cache(maxsize=None)
+def _vertex():
+    try:
+        from google.cloud import aiplatform
+        from google.oauth2 import service_account
+    except ImportError:
+        return None, None
+    if not GOOGLE_CREDENTIALS:
+        print("⚠️ Missing GOOGLE_APPLICATION_CREDENTIALS – Gemini calls will fail if used.")
+    return aiplatform, service_account
 
 
 def call_model(provider: str, prompt: str, **kwargs) -> str:
@@ -49,6 +62,7 @@ def call_model(provider: str, prompt: str, **kwargs) -> str:
 
     # ─── OPENAI ────────────────────────────────────────────────────────────────
     if provider == "openai":
+        openai = _openai()
         if not openai.api_key:
             raise RuntimeError("OpenAI API key missing.")
         try:
@@ -62,7 +76,7 @@ def call_model(provider: str, prompt: str, **kwargs) -> str:
         except Exception as e:
             # Fallback to Groq Llama
             print(f"⚠️ OpenAI error: {e}. Falling back to Groq Llama…")
-            completion = groq_client.chat.completions.create(
+            completion = _groq_client().chat.completions.create(
                 model="llama-3.3-70b-versatile",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=1,
@@ -80,6 +94,7 @@ def call_model(provider: str, prompt: str, **kwargs) -> str:
 
     # ─── ANTHROPIC/CLAUDE ────────────────────────────────────────────────────────
     elif provider in ("anthropic", "claude"):
+        Anthropic, HUMAN_PROMPT, AI_PROMPT = _anthropic()
         if Anthropic is None or not ANTHROPIC_API_KEY:
             raise RuntimeError("Anthropic SDK or key missing.")
         client = Anthropic(api_key=ANTHROPIC_API_KEY)
@@ -93,6 +108,7 @@ def call_model(provider: str, prompt: str, **kwargs) -> str:
 
     # ─── GOOGLE GEMINI/PaLM ─────────────────────────────────────────────────────
     elif provider in ("gemini", "google"):
+        aiplatform, service_account = _vertex()
         if aiplatform is None or not GOOGLE_CREDENTIALS:
             raise RuntimeError("Vertex AI SDK or creds missing.")
         creds  = service_account.Credentials.from_service_account_file(GOOGLE_CREDENTIALS)
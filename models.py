@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from tenancy import TenantSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': TenantSession})
 
 # association table for store ↔ admins
 store_admins = db.Table(
@@ -28,7 +29,8 @@ class Store(db.Model):
     orders   = db.relationship('Order', back_populates='store', lazy=True)
 
 class Product(db.Model):
-    __tablename__ = 'product'
+    __tablename__   = 'product'
+    __table_args__  = {'sqlite_autoincrement': True}   # id ranges per shard, see tenancy.py
     id              = db.Column(db.Integer, primary_key=True)
     name            = db.Column(db.String(150), nullable=False)
     price           = db.Column(db.Float, nullable=False)
@@ -42,6 +44,7 @@ class Product(db.Model):
 
 class ChatSession(db.Model):
     __tablename__   = 'chat_session'
+    __table_args__  = {'sqlite_autoincrement': True}
     id              = db.Column(db.Integer, primary_key=True)
     user_id         = db.Column(db.Integer, db.ForeignKey('user.id'),   nullable=False)
     product_id      = db.Column(db.Integer, db.ForeignKey('product.id'),nullable=False)
@@ -50,10 +53,21 @@ class ChatSession(db.Model):
     created_at      = db.Column(db.DateTime, default=datetime.utcnow)
     user            = db.relationship('User',    back_populates='sessions', lazy=True)
     product         = db.relationship('Product', back_populates='sessions', lazy=True)
-    messages        = db.relationship('Message', back_populates='session', lazy=True)
+    messages        = db.relationship('Message', back_populates='session', lazy=True,
+                                      order_by='(Message.timestamp, Message.id)')
+    archive         = db.relationship('ChatArchive', back_populates='session', uselist=False, lazy=True)
+    end             = db.relationship('ChatSessionEnd', back_populates='session', uselist=False, lazy=True)
     current_price = db.Column(db.Float, nullable=False)
 
 
+class ChatSessionEnd(db.Model):
+    # Own table: create_all() doesn't add columns to an existing chat_session
+    __tablename__ = 'chat_session_end'
+    session_id    = db.Column(db.Integer, db.ForeignKey('chat_session.id'), primary_key=True)
+    ended_at      = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    session       = db.relationship('ChatSession', back_populates='end', lazy=True)
+
+
 class Message(db.Model):
     __tablename__ = 'message'
     id         = db.Column(db.Integer, primary_key=True)
@@ -63,6 +77,14 @@ class Message(db.Model):
     timestamp  = db.Column(db.DateTime,    server_default=db.func.current_timestamp(), nullable=False)
     session    = db.relationship('ChatSession', back_populates='messages', lazy=True)
 
+class ChatArchive(db.Model):
+    __tablename__ = 'chat_archive'
+    session_id    = db.Column(db.Integer, db.ForeignKey('chat_session.id'), primary_key=True)
+    message_count = db.Column(db.Integer, nullable=False)
+    transcript    = db.Column(db.LargeBinary, nullable=False)   # zlib-compressed JSON list of messages
+    archived_at   = db.Column(db.DateTime, default=datetime.utcnow)
+    session       = db.relationship('ChatSession', back_populates='archive', lazy=True)
+
 class Order(db.Model):
     __tablename__   = 'order'
     id              = db.Column(db.Integer, primary_key=True)
@@ -72,3 +94,32 @@ class Order(db.Model):
     timestamp       = db.Column(db.DateTime, server_default=db.func.current_timestamp(), nullable=False)
     user            = db.relationship('User',  back_populates='orders', lazy=True)
     store           = db.relationship('Store', back_populates='orders', lazy=True)
+
+class Deal(db.Model):
+    __tablename__ = 'deal'
+    id         = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=True)
+    user_id    = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    list_price = db.Column(db.Float, nullable=False)
+    price      = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class ProductStats(db.Model):
+    """Negotiation aggregates per product, maintained by analytics.py."""
+    __tablename__      = 'product_stats'
+    product_id         = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    sessions           = db.Column(db.Integer, nullable=False, default=0)
+    closed_sessions    = db.Column(db.Integer, nullable=False, default=0)
+    deals              = db.Column(db.Integer, nullable=False, default=0)
+    discount_total     = db.Column(db.Float,   nullable=False, default=0.0)
+    time_to_deal_total = db.Column(db.Float,   nullable=False, default=0.0)   # seconds
+    updated_at         = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def avg_discount(self):
+        return self.discount_total / self.deals if self.deals else 0.0
+
+    @property
+    def avg_time_to_deal(self):
+        return self.time_to_deal_total / self.deals if self.deals else 0.0
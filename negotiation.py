@@ -0,0 +1,141 @@
+"""
+Negotiation logic for one assistant turn, independent of Flask and the DB.
+
+chat_routes feeds it a live session; replay.py feeds it stored or JSONL
+transcripts. `product` is anything with name / price / max_discount /
+description attributes; `history` is a list of (role, content) pairs that
+already includes the pending user message(s).
+"""
+from collections import namedtuple
+from functools import lru_cache
+import intent
+import product_brief
+
+Turn = namedtuple('Turn', 'message price handoff model_called')
+
+MODEL_ERROR_INFO  = "⚠️ Sorry, something went wrong. Please try again shortly."
+MODEL_ERROR_OFFER = "⚠️ Error reaching the model—please try again."
+
+# Replies used when `call` is None (see load_shed.py)
+BUSY_INFO  = ("We’re helping a lot of shoppers right now, so I’ll keep it short: **{name}** is "
+              "**${price:.2f}**. Ask me again in a minute for more detail!")
+BUSY_OFFER = ("We’re very busy at the moment, so the best I can confirm right now is **${price:.2f}** "
+              "for **{name}**. Click Add to Cart to lock it in, or try me again in a minute.")
+
+
+@lru_cache(maxsize=1024)
+def greeting(product_id, name, price):
+    """Opening line per product version; keyed on name/price so edits invalidate it."""
+    return (
+        f"Hello! I’m here to help you with **{name}**. "
+        f"Our list price is **${price:.2f}**—let me know any questions or what price you have in mind!"
+    )
+
+
+def floor_price(product):
+    return round(product.price - product.max_discount, 2)
+
+
+def _transcript(system_prompt, history):
+    convo = [{"role": "system", "content": system_prompt}]
+    for role, content in history:
+        role = 'assistant' if role in ('assistant','admin') else 'user'
+        convo.append({"role": role, "content": content})
+    return "\n".join(m["content"] for m in convo)
+
+
+def info_prompt(product, current_price, history):
+    system_prompt = (
+        "You’re a friendly sales assistant. "
+        "Answer product questions warmly—and do NOT offer a discount unless explicitly asked.\n\n"
+        f"Product: {product.name}\n"
+        f"Description: {product_brief.brief(product)}\n"
+        f"Current Price: ${current_price:.2f}\n"
+    )
+    return _transcript(system_prompt, history)
+
+
+def negotiation_prompt(product, current_price, floor, history, step=None):
+    system_prompt = (
+        "You’re a warm, human‐like sales assistant negotiating step by step.\n\n"
+        f"Product: {product.name}\n"
+        f"Description: {product_brief.brief(product)}\n"
+        f"Current Price: ${current_price:.2f}\n"
+        f"Floor Price: ${floor:.2f}\n\n"
+        "GUIDELINES:\n"
+        "1. First offer: small (~5%) off current price, above floor.\n"
+        "2. Phrase naturally: “I can meet you at $X.XX—does that work for you?”\n"
+        "3. If pressed again, step down until floor.\n"
+        "4. At floor: “I’m sorry, but $<floor> is the best I can do.”\n"
+        "5. If admin override appears, use that price silently.\n"
+        "6. Keep it warm and natural.\n"
+    )
+    if step:
+        system_prompt += f"7. Concede in steps of about ${step:.2f}.\n"
+    return _transcript(system_prompt, history)
+
+
+def clamp_offer(bot_text, current_price, floor):
+    """Price after the assistant's reply: any offer it made, kept within [floor, current]."""
+    match = intent.PRICE_RE.search(bot_text)
+    if not match:
+        return current_price
+    offered = float(match.group(1))
+    return round(max(floor, min(offered, current_price)), 2)
+
+
+def respond(product, current_price, history, user_text, call, floor=None, step=None):
+    """
+    Decide and produce the next assistant turn. `call(prompt) -> str` is the
+    model adapter; it is only invoked for info and negotiation replies, and
+    with `call=None` those get a canned reply at the current price instead.
+    `floor`/`step` override the static floor (see pricing.py).
+    """
+    if floor is None:
+        floor = floor_price(product)
+    # A session's price never goes up, even when a refreshed dynamic floor is above it
+    floor = min(floor, current_price)
+    said  = intent.classify(user_text)
+
+    # 1) Asked for a person: hand over without a model call
+    if said.label == intent.HANDOFF:
+        return Turn("Of course — I’ve asked a member of our team to join this chat. "
+                    "They’ll be with you shortly.", current_price, True, False)
+
+    # 2) If at floor price already, inform politely
+    if current_price <= floor:
+        return Turn(
+            f"I'm truly sorry, but **${floor:.2f}** is the best price for **{product.name}**. "
+            "Please click Add to Cart if you’d like to proceed.",
+            floor, False, False
+        )
+
+    # 3) Ready to buy, or offering at least the current price: confirm, no model call
+    if said.label == intent.PURCHASE or (
+            said.label == intent.COUNTER_OFFER and said.amount >= current_price):
+        return Turn(
+            f"Wonderful! Your price for **{product.name}** is **${current_price:.2f}**. "
+            "Click Add to Cart whenever you’re ready.",
+            current_price, False, False
+        )
+
+    # 4) Info mode (no discount)
+    if said.label not in (intent.DISCOUNT, intent.COUNTER_OFFER):
+        if call is None:
+            return Turn(BUSY_INFO.format(name=product.name, price=current_price),
+                        current_price, False, False)
+        try:
+            bot_text = call(info_prompt(product, current_price, history))
+        except Exception:
+            bot_text = MODEL_ERROR_INFO
+        return Turn(bot_text, current_price, False, True)
+
+    # 5) Negotiation mode
+    if call is None:
+        return Turn(BUSY_OFFER.format(name=product.name, price=current_price),
+                    current_price, False, False)
+    try:
+        bot_text = call(negotiation_prompt(product, current_price, floor, history, step))
+    except Exception:
+        bot_text = MODEL_ERROR_OFFER
+    return Turn(bot_text, clamp_offer(bot_text, current_price, floor), False, True)
@@ -0,0 +1,148 @@
+"""
+Password hashing policy and off-thread verification.
+
+PBKDF2 verification is deliberately slow; during a login burst it used to
+run on every request thread at once. Here it runs in a bounded process pool
+per app worker, with a queue limit so a burst is turned away early instead
+of pinning every CPU, and a short-lived cache of successful verifications
+so repeat logins within the TTL skip the KDF entirely.
+
+Config:
+    PASSWORD_HASH_METHOD      werkzeug method for new hashes
+                              (default 'pbkdf2:sha256:600000'); older hashes
+                              are upgraded, in the pool, on the next
+                              successful login
+    PASSWORD_VERIFY_WORKERS   pool size; 0 verifies inline (default: CPU count)
+    PASSWORD_VERIFY_QUEUE     max verifications waiting per app worker
+                              (default: 4 x pool size)
+    PASSWORD_VERIFY_TIMEOUT   seconds to wait for a result (default 10)
+    PASSWORD_CACHE_TTL        seconds a successful check is remembered
+                              (default 300; 0 disables the cache)
+"""
+import os
+import hmac
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+CACHE_SIZE     = 4096
+
+
+class VerifierBusy(Exception):
+    """Too many verifications already queued; the caller should retry later."""
+
+
+_pool       = None
+_pool_lock  = threading.Lock()
+_slots      = None
+_cache      = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _config(name, default):
+    return current_app.config.get(name, default)
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=_config('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    # werkzeug expands short forms ('scrypt' -> 'scrypt:32768:8:1'), so ask it
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def needs_rehash(pwhash):
+    """True if the stored hash was made with a different method than the policy."""
+    method = _config('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    return pwhash.split('$', 1)[0] != _method_prefix(method)
+
+
+def rehash_password(password):
+    """A hash under the current policy, computed in the pool like verification."""
+    return _offload(generate_password_hash, password, _config('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+
+
+def _get_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = _config('PASSWORD_VERIFY_WORKERS', os.cpu_count() or 1)
+            _pool  = ProcessPoolExecutor(max_workers=workers)
+            _slots = threading.BoundedSemaphore(_config('PASSWORD_VERIFY_QUEUE', 4 * workers))
+        return _pool, _slots
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _cache_key(pwhash, password):
+    secret = current_app.config['SECRET_KEY'].encode('utf-8')
+    return hmac.new(secret, f"{pwhash}\0{password}".encode('utf-8'), hashlib.sha256).digest()
+
+
+def _cached(key):
+    with _cache_lock:
+        expires = _cache.get(key)
+        if expires is None:
+            return False
+        if expires <= time.time():
+            del _cache[key]
+            return False
+        _cache.move_to_end(key)
+        return True
+
+
+def _remember(key, ttl):
+    with _cache_lock:
+        _cache[key] = time.time() + ttl
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _offload(fn, *args):
+    """fn(*args) in the pool (inline with 0 workers); VerifierBusy if the queue is full or slow."""
+    if _config('PASSWORD_VERIFY_WORKERS', os.cpu_count() or 1) == 0:
+        return fn(*args)
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise VerifierBusy()
+    try:
+        return pool.submit(fn, *args).result(timeout=_config('PASSWORD_VERIFY_TIMEOUT', 10))
+    except TimeoutError:
+        raise VerifierBusy()
+    except BrokenProcessPool:
+        _reset_pool()
+        raise VerifierBusy()
+    finally:
+        slots.release()
+
+
+def verify_password(pwhash, password):
+    """
+    Check a password against its stored hash. Raises VerifierBusy when the
+    pool's queue is full or the result doesn't arrive within the timeout.
+    """
+    ttl = _config('PASSWORD_CACHE_TTL', 300)
+    key = _cache_key(pwhash, password) if ttl else None
+    if key and _cached(key):
+        return True
+
+    ok = _offload(check_password_hash, pwhash, password)
+    if ok and key:
+        _remember(key, ttl)
+    return ok
@@ -0,0 +1,122 @@
+"""
+Optional dynamic floor pricing.
+
+With DYNAMIC_PRICING enabled, per-product floors and concession step sizes
+are derived from historical outcomes (prices customers accepted from a chat
+and added to the cart, at most one per customer and product), computed for
+the whole catalog at once with NumPy and cached per process (and per store
+shard, see tenancy.py) for PRICING_REFRESH_SECONDS. Negotiation then only
+does a dict lookup.
+
+Chats that ended without a deal are not outcomes: a session only ends when
+an admin terminates it, and its last price is an offer nobody accepted.
+
+A product's dynamic floor sits FLOOR_SHRINK of the way from the static floor
+(price - max_discount) to the lower quartile of accepted prices, and never
+above list price. The assistant never offers below the current floor, so
+accepted prices are always at or above it; shrinking toward the static floor
+lets the floor come back down when customers keep settling at it, instead
+of only ever ratcheting up. Products with fewer than PRICING_MIN_SAMPLES
+outcomes, or a missing NumPy, keep the static floor.
+"""
+import time
+import threading
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import func
+from models import db, Product, Deal
+import negotiation
+import tenancy
+
+# ─── OPTIONAL: NumPy ────────────────────────────
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Quote = namedtuple('Quote', 'floor step')
+
+FLOOR_SHRINK = 0.5
+
+_tables     = {}    # shard key -> (computed_at, table)
+_table_lock = threading.Lock()
+
+
+def compute_table(min_samples=5):
+    """Floors and steps for every product, in one query and one vectorized pass."""
+    products = db.session.query(Product.id, Product.price, Product.max_discount).all()
+    if not products or np is None:
+        return {}
+    # Accepted prices only (add_to_cart records a deal for a chat's own
+    # price), one per customer and product so repeats don't add weight
+    outcomes = (
+        db.session.query(Deal.product_id, func.max(Deal.price))
+                  .filter(Deal.session_id != None)
+                  .group_by(Deal.product_id, Deal.user_id)
+                  .all()
+    )
+
+    if not outcomes:
+        return {}
+
+    ids    = np.array([p[0] for p in products])
+    price  = np.array([p[1] for p in products], dtype=float)
+    static = np.round(price - np.array([p[2] for p in products], dtype=float), 2)
+
+    # Map outcome product ids onto catalog rows; drop outcomes for deleted products
+    o_ids   = np.array([o[0] for o in outcomes])
+    o_price = np.array([o[1] for o in outcomes], dtype=float)
+    order   = np.argsort(ids)
+    pos     = np.searchsorted(ids, o_ids, sorter=order)
+    pos     = np.clip(pos, 0, len(ids) - 1)
+    known   = ids[order][pos] == o_ids
+    if not known.any():
+        return {}
+    rows    = order[pos[known]]
+    o_price = o_price[known]
+
+    counts = np.bincount(rows, minlength=len(ids))
+    # Sort outcomes by (row, price) so each product's prices are contiguous and ordered
+    srt     = np.lexsort((o_price, rows))
+    sorted_price = o_price[srt]
+    last    = len(sorted_price) - 1
+    starts  = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    q1_idx  = starts + np.floor((counts - 1) * 0.25).astype(int)
+    med_idx = starts + np.floor((counts - 1) * 0.5).astype(int)
+    enough  = counts >= min_samples
+    q1      = np.where(enough, sorted_price[np.minimum(q1_idx, last)], static)
+    median  = np.where(enough, sorted_price[np.minimum(med_idx, last)], price)
+
+    settled = np.clip(q1, static, price)
+    floor   = np.round(static + FLOOR_SHRINK * (settled - static), 2)
+    # About three concessions from list to the typical settled price
+    step  = np.round(np.maximum((price - np.maximum(median, floor)) / 3, 0.01 * price), 2)
+
+    return {
+        int(pid): Quote(float(f), float(s))
+        for pid, f, s, ok in zip(ids, floor, step, enough) if ok
+    }
+
+
+def _current_table():
+    key = tenancy.shard_key()
+    ttl = current_app.config.get('PRICING_REFRESH_SECONDS', 600)
+    computed, table = _tables.get(key, (0.0, {}))
+    if time.time() - computed > ttl:
+        with _table_lock:
+            computed, table = _tables.get(key, (0.0, {}))
+            if time.time() - computed > ttl:
+                table = compute_table(current_app.config.get('PRICING_MIN_SAMPLES', 5))
+                _tables[key] = (time.time(), table)
+    return table
+
+
+def quote(product):
+    """Floor and suggested step for a product; the static floor when pricing is off."""
+    static = negotiation.floor_price(product)
+    if current_app.config.get('DYNAMIC_PRICING') and np is not None:
+        q = _current_table().get(product.id)
+        if q:
+            # the product may have been edited since the table was computed
+            return Quote(round(max(static, min(q.floor, product.price)), 2), q.step)
+    return Quote(static, None)
@@ -0,0 +1,86 @@
+"""
+Condensed, token-bounded product briefs for model prompts.
+
+Descriptions are free text and can run to pages; they used to be pasted
+verbatim into the system prompt of every info and negotiation turn. The
+brief keeps the description's leading sentences (markup stripped,
+whitespace collapsed, repeated sentences dropped) up to MAX_BRIEF_TOKENS.
+It is cached per description text, so an edited product gets a fresh
+brief and an unchanged one is condensed once per worker.
+
+    flask --app app brief-report     # token savings across the catalog
+"""
+import re
+from functools import lru_cache
+import click
+from flask.cli import with_appcontext
+
+MAX_BRIEF_TOKENS = 120
+
+_TAG_RE      = re.compile(r'<[^>]+>|[*_`#>]+')
+_SPACE_RE    = re.compile(r'\s+')
+_SENTENCE_RE = re.compile(r'\s*(?:\n\s*[-•]?\s*)+|(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English; call_model doesn't return usage
+    return max(1, len(text) // 4)
+
+
+def _sentences(text):
+    seen = set()
+    for raw in _SENTENCE_RE.split(_TAG_RE.sub(' ', text)):
+        sentence = _SPACE_RE.sub(' ', raw).strip()
+        key = sentence.lower().rstrip('.!?')
+        if sentence and key not in seen:
+            seen.add(key)
+            yield sentence
+
+
+@lru_cache(maxsize=2048)
+def condense(text, max_tokens=MAX_BRIEF_TOKENS):
+    """Leading distinct sentences of `text` that fit in `max_tokens`."""
+    kept, used = [], 0
+    for sentence in _sentences(text or ''):
+        cost = estimate_tokens(sentence) + 1
+        if used + cost <= max_tokens:
+            kept.append(sentence)
+            used += cost
+            continue
+        if not kept:
+            # A single over-long sentence: cut it at a word boundary
+            cut = sentence[:max_tokens * 4].rsplit(' ', 1)[0]
+            kept.append(cut.rstrip(',;:') + '…')
+        break
+    return ' '.join(kept)
+
+
+def brief(product, max_tokens=MAX_BRIEF_TOKENS):
+    """The description text to put in prompts for `product`."""
+    return condense(product.description or '', max_tokens)
+
+
+# ─── Report: `flask --app app brief-report` ─────
+@click.command("brief-report")
+@click.option("--max-tokens", default=MAX_BRIEF_TOKENS, show_default=True)
+@with_appcontext
+def brief_report(max_tokens):
+    """Show prompt tokens saved by product briefs across the catalog."""
+    from models import Product
+    import tenancy
+
+    rows = []
+    for _ in tenancy.each_store():
+        for p in Product.query.order_by(Product.id):
+            raw = estimate_tokens(p.description) if p.description else 0
+            condensed = estimate_tokens(condense(p.description, max_tokens)) if p.description else 0
+            rows.append((p.id, p.name, raw, condensed))
+
+    raw_total = sum(r[2] for r in rows)
+    new_total = sum(r[3] for r in rows)
+    for pid, name, raw, condensed in sorted(rows, key=lambda r: r[3] - r[2])[:10]:
+        if raw > condensed:
+            print(f"  #{pid:<5} {name[:40]:40} {raw:>6} → {condensed:>4} tokens")
+    saved = (raw_total - new_total) / raw_total if raw_total else 0.0
+    print(f"✅ {len(rows)} product(s): {raw_total:,} → {new_total:,} description tokens per prompt "
+          f"({saved:.0%} saved)")
@@ -1,9 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, abort, flash
-from models import db, Store, Product
+from models import db, Store, Product, ProductStats
+from http_cache import catalog_page, bump_catalog
+from load_shed import shed_when_busy
+import product_brief
 
 product_bp = Blueprint('product', __name__)
 
 @product_bp.route('/store/<int:store_id>/products')
+@catalog_page
+@shed_when_busy
 def list_products(store_id):
     store = Store.query.get_or_404(store_id)
     products = Product.query.filter_by(store_id=store_id).all()
@@ -33,6 +38,7 @@ def add_product(store_id):
         )
         db.session.add(prod)
         db.session.commit()
+        bump_catalog()
         flash(f"Product '{name}' added.", "success")
         return redirect(url_for('store.dashboard'))
 
@@ -52,6 +58,8 @@ def edit_product(store_id, product_id):
         prod.justification   = request.form.get('justification','').strip()
         prod.other_discounts = request.form.get('other_discounts','').strip()
         db.session.commit()
+        bump_catalog()
+        product_brief.brief(prod)   # condense the new description now, not on the next chat turn
         flash("Product updated.", "success")
         return redirect(url_for('store.dashboard'))
     return render_template('edit_product.html', store=store, product=prod)
@@ -62,7 +70,9 @@ def delete_product(store_id, product_id):
     if not session.get('is_store_admin') or session.get('store_id')!=store_id:
         abort(403)
     prod = Product.query.get_or_404(product_id)
+    ProductStats.query.filter_by(product_id=prod.id).delete()
     db.session.delete(prod)
     db.session.commit()
+    bump_catalog()
     flash("Product deleted.", "info")
     return redirect(url_for('store.dashboard'))
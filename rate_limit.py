@@ -0,0 +1,75 @@
+"""
+Token-bucket rate limiting. Buckets live in the shared_state backend, so
+limits are per process with memory:// and global with a shared backend.
+
+Limits are (tokens per second, burst) pairs, overridable per scope through
+app.config['RATE_LIMITS'].
+"""
+import math
+import time
+from functools import wraps
+from flask import current_app, request
+from shared_state import get_backend
+
+DEFAULT_LIMITS = {
+    'chat_send': (0.5, 6),    # one message every 2s, bursts of 6
+    'login':     (0.1, 5),    # one attempt every 10s, bursts of 5
+}
+
+
+def _limits(scope):
+    return current_app.config.get('RATE_LIMITS', {}).get(scope, DEFAULT_LIMITS[scope])
+
+
+def peek(scope, key, cost=1):
+    """Whether `cost` tokens are available, without taking them; (allowed, retry_after_seconds)."""
+    rate, burst = _limits(scope)
+    state = get_backend().get(f"ratelimit:{scope}:{key}")
+    if state is None:
+        return True, 0
+    tokens, stamp, _ = state
+    tokens = min(burst, tokens + (time.time() - stamp) * rate)
+    if tokens >= cost:
+        return True, 0
+    return False, math.ceil((cost - tokens) / rate)
+
+
+def consume(scope, key, cost=1):
+    """Take `cost` tokens from the bucket; returns (allowed, retry_after_seconds)."""
+    rate, burst = _limits(scope)
+    now = time.time()
+
+    def take(state):
+        tokens, stamp, _ = state or (burst, now, True)
+        tokens = min(burst, tokens + (now - stamp) * rate)
+        if tokens >= cost:
+            return [tokens - cost, now, True]
+        return [tokens, now, False]
+
+    tokens, _, allowed = get_backend().update(
+        f"ratelimit:{scope}:{key}", take, ttl=math.ceil(burst / rate) + 1
+    )
+    retry_after = 0 if allowed else math.ceil((cost - tokens) / rate)
+    return allowed, retry_after
+
+
+def rate_limited(scope, key_func, on_limit, methods=None):
+    """
+    View decorator. key_func(**view_args) returns one key or a tuple of keys
+    (every bucket must have a token); on_limit(retry_after) builds the
+    response, which is sent with a Retry-After header.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if methods is None or request.method in methods:
+                keys = key_func(**kwargs)
+                for key in ((keys,) if isinstance(keys, str) else keys):
+                    allowed, retry_after = consume(scope, key)
+                    if not allowed:
+                        resp = current_app.make_response(on_limit(retry_after))
+                        resp.headers['Retry-After'] = str(retry_after)
+                        return resp
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
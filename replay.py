@@ -0,0 +1,232 @@
+# replay.py
+"""
+Offline batch replay of negotiation transcripts.
+
+Re-runs the customer side of stored conversations through negotiation.respond()
+with a chosen model adapter and reports where prices ended up relative to the
+floor, model-call latency and (estimated) token usage. Use it to compare a
+prompt or provider change before shipping it.
+
+    python replay.py --db [--limit 500]            # ChatSession/Message rows
+    python replay.py --jsonl transcripts.jsonl     # one transcript per line
+        --provider scripted|openai|anthropic|gemini   (default: scripted)
+        --concurrency 16                               # worker pool size / cap
+        --out results.jsonl                            # per-transcript results
+
+JSONL lines look like:
+    {"product": {"name": "...", "price": 19.99, "max_discount": 2.0,
+                 "description": "..."},
+     "messages": [{"role": "user", "content": "..."}, ...]}
+Only the user messages are replayed; assistant turns are regenerated.
+
+The `scripted` provider answers locally (steps ~5% towards the floor), so
+the harness itself can be measured without spending provider quota.
+"""
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+import negotiation
+from product_brief import estimate_tokens
+
+_PROMPT_PRICE_RE = re.compile(r'^(Current|Floor) Price: \$([0-9]+(?:\.[0-9]{1,2})?)$', re.MULTILINE)
+
+
+def scripted_model(prompt):
+    prices = dict(_PROMPT_PRICE_RE.findall(prompt))
+    if 'Floor' not in prices:
+        return "Happy to help with any questions about this product!"
+    current, floor = float(prices['Current']), float(prices['Floor'])
+    offer = max(floor, round(current * 0.95, 2))
+    return f"I can meet you at ${offer:.2f}—does that work for you?"
+
+
+def make_adapter(provider):
+    if provider == 'scripted':
+        return scripted_model
+    from model_adapters import call_model
+    return lambda prompt: call_model(provider, prompt)
+
+
+class Meter:
+    """
+    Thread-safe wrapper around the adapter recording latency, token estimates
+    and failures. negotiation.respond swallows adapter exceptions (the reply
+    becomes MODEL_ERROR_* at an unchanged price), so they are counted here
+    before being re-raised.
+    """
+
+    def __init__(self, call):
+        self.call      = call
+        self.lock      = threading.Lock()
+        self.latencies = []
+        self.errors    = 0
+        self.tokens_in = self.tokens_out = 0
+
+    def __call__(self, prompt):
+        t = time.perf_counter()
+        try:
+            reply = self.call(prompt)
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            raise
+        elapsed = time.perf_counter() - t
+        with self.lock:
+            self.latencies.append(elapsed)
+            self.tokens_in  += estimate_tokens(prompt)
+            self.tokens_out += estimate_tokens(reply)
+        return reply
+
+
+def replay_one(transcript, call):
+    product = transcript['product']
+    price   = product.price
+    history = [('assistant', negotiation.greeting(product.id, product.name, product.price))]
+    turns, handoff, errors = 0, False, 0
+
+    def counted(prompt):
+        nonlocal errors
+        try:
+            return call(prompt)
+        except Exception:
+            errors += 1
+            raise
+
+    for text in transcript['user_messages']:
+        history.append(('user', text))
+        turn = negotiation.respond(product, price, history, text, counted)
+        history.append(('assistant', turn.message))
+        price, handoff = turn.price, turn.handoff
+        turns += 1
+        if handoff:
+            break
+    floor = negotiation.floor_price(product)
+    return {
+        'id':          transcript['id'],
+        'product':     product.name,
+        'list_price':  product.price,
+        'floor':       floor,
+        'final_price': price,
+        'turns':       turns,
+        'at_floor':    price <= floor,
+        'below_floor': price < floor,
+        'handoff':     handoff,
+        'model_errors': errors,     # non-zero: the final price is not a real outcome
+    }
+
+
+def load_jsonl(path):
+    transcripts = []
+    with open(path, encoding='utf-8') as fh:
+        for i, line in enumerate(fh):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            p   = row['product']
+            transcripts.append({
+                'id': row.get('id', i),
+                'product': SimpleNamespace(
+                    id=p.get('id', i), name=p['name'], price=float(p['price']),
+                    max_discount=float(p['max_discount']), description=p.get('description', '')
+                ),
+                'user_messages': [m['content'] for m in row['messages'] if m['role'] == 'user'],
+            })
+    return transcripts
+
+
+def load_db(limit=None):
+    from app import create_app
+    from models import ChatSession
+    from archive import session_messages
+    import tenancy
+
+    app = create_app()
+    transcripts = []
+    with app.app_context():
+        for _ in tenancy.each_store():
+            query = ChatSession.query.order_by(ChatSession.id)
+            if limit:
+                query = query.limit(limit - len(transcripts))
+            for cs in query:
+                p = cs.product
+                if p is None:
+                    continue
+                transcripts.append({
+                    'id': cs.id,
+                    'product': SimpleNamespace(
+                        id=p.id, name=p.name, price=p.price,
+                        max_discount=p.max_discount, description=p.description
+                    ),
+                    'user_messages': [m.content for m in session_messages(cs) if m.role == 'user'],
+                })
+            if limit and len(transcripts) >= limit:
+                break
+    return transcripts
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def report(results, meter, elapsed):
+    n = len(results)
+    print(f"transcripts       {n} in {elapsed:.1f}s  ({n / elapsed * 60:,.0f}/min)")
+    if not n:
+        return
+    failed = sum(1 for r in results if r['model_errors'])
+    calls  = len(meter.latencies) + meter.errors
+    if meter.errors:
+        print(f"model errors      {meter.errors}/{calls} calls ({meter.errors / calls:.1%})"
+              f"   in {failed}/{n} transcripts (prices below exclude them)")
+    results = [r for r in results if not r['model_errors']]
+    n = len(results)
+    if not n:
+        return
+    ratios = [r['final_price'] / r['list_price'] for r in results if r['list_price']]
+    print(f"final/list price  mean {statistics.mean(ratios):.3f}"
+          f"   mean discount {1 - statistics.mean(ratios):.1%}")
+    print(f"ended at floor    {sum(r['at_floor'] for r in results)}/{n}"
+          f"   below floor {sum(r['below_floor'] for r in results)}"
+          f"   handed off {sum(r['handoff'] for r in results)}")
+    if meter.latencies:
+        lat = meter.latencies
+        print(f"model calls       {len(lat)}   latency p50 {pct(lat, .5) * 1000:.1f} ms"
+              f"   p90 {pct(lat, .9) * 1000:.1f} ms   p99 {pct(lat, .99) * 1000:.1f} ms")
+        print(f"tokens (est.)     in {meter.tokens_in:,}   out {meter.tokens_out:,}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay negotiation transcripts offline.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument('--db', action='store_true', help="replay ChatSession/Message rows")
+    src.add_argument('--jsonl', help="replay transcripts from a JSONL file")
+    ap.add_argument('--limit', type=int, help="max sessions to load with --db")
+    ap.add_argument('--provider', default='scripted')
+    ap.add_argument('--concurrency', type=int, default=8, help="worker pool size (caps in-flight model calls)")
+    ap.add_argument('--out', help="write per-transcript results as JSONL")
+    args = ap.parse_args(argv)
+
+    transcripts = load_db(args.limit) if args.db else load_jsonl(args.jsonl)
+    meter = Meter(make_adapter(args.provider))
+
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        results = list(pool.map(lambda tr: replay_one(tr, meter), transcripts))
+    elapsed = time.perf_counter() - t
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as fh:
+            for r in results:
+                fh.write(json.dumps(r) + "\n")
+    report(results, meter, elapsed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
 # seed_ten_products.py
 
-from app import app
+from app import create_app
 from models import db, Store, Product
+from http_cache import bump_catalog
+from tenancy import use_store
 
 products = [
     {
@@ -86,22 +88,26 @@ products = [
     },
 ]
 
+app = create_app()
+
 with app.app_context():
     store = Store.query.first()
     if not store:
         print("❌ No store found! Create a store first.")
         exit(1)
 
-    for data in products:
-        p = Product(
-            name=data["name"],
-            price=data["price"],
-            max_discount=data["max_discount"],
-            description=data["description"],
-            justification=data["justification"],
-            other_discounts=data["other_discounts"],
-            store_id=store.id
-        )
-        db.session.add(p)
-    db.session.commit()
+    with use_store(store.id):
+        for data in products:
+            p = Product(
+                name=data["name"],
+                price=data["price"],
+                max_discount=data["max_discount"],
+                description=data["description"],
+                justification=data["justification"],
+                other_discounts=data["other_discounts"],
+                store_id=store.id
+            )
+            db.session.add(p)
+        db.session.commit()
+    bump_catalog()
     print(f"✅ Seeded {len(products)} products into store '{store.name}'.")
@@ -0,0 +1,112 @@
+"""
+Cookie session interface that avoids redundant signing work.
+
+Flask's default interface builds a new signing serializer and verifies the
+cookie's HMAC on every request, and re-signs whenever the session is marked
+modified, even if the values are unchanged. This one:
+
+  * keeps one serializer per app;
+  * remembers recently verified cookies (an LRU keyed on the cookie value),
+    so an unchanged cookie is only verified once per worker while it is
+    within PERMANENT_SESSION_LIFETIME;
+  * re-signs only when the session contents actually differ from what the
+    request brought in.
+
+Config:
+    SESSION_VERIFY_CACHE   verified cookies remembered per worker
+                           (default 1024; 0 disables the cache)
+"""
+import copy
+import time
+import threading
+from collections import OrderedDict
+from itsdangerous import BadSignature
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface
+
+
+class CompactSession(SecureCookieSession):
+    """Session that remembers the contents it was opened with."""
+
+    def __init__(self, initial=None):
+        super().__init__(initial)
+        self.original = copy.deepcopy(dict(initial or {}))
+
+
+class CachedSessionInterface(SecureCookieSessionInterface):
+    session_class = CompactSession
+
+    def __init__(self):
+        self._serializer = None
+        self._secret     = None
+        self._verified   = OrderedDict()
+        self._lock       = threading.Lock()
+
+    def get_signing_serializer(self, app):
+        if not app.secret_key:
+            return None
+        if self._serializer is None or self._secret != app.secret_key:
+            with self._lock:
+                self._verified.clear()
+            self._serializer = super().get_signing_serializer(app)
+            self._secret     = app.secret_key
+        return self._serializer
+
+    # ─── Verified-cookie cache ──────────────────────
+    def _lookup(self, val):
+        with self._lock:
+            hit = self._verified.get(val)
+            if hit is None:
+                return None
+            data, expires = hit
+            if expires <= time.time():
+                del self._verified[val]
+                return None
+            self._verified.move_to_end(val)
+            return copy.deepcopy(data)
+
+    def _remember(self, app, val, data, signed_at):
+        size = app.config.get('SESSION_VERIFY_CACHE', 1024)
+        if not size:
+            return
+        expires = signed_at + app.permanent_session_lifetime.total_seconds()
+        with self._lock:
+            self._verified[val] = (copy.deepcopy(data), expires)
+            self._verified.move_to_end(val)
+            while len(self._verified) > size:
+                self._verified.popitem(last=False)
+
+    # ─── SessionInterface ───────────────────────────
+    def open_session(self, app, request):
+        s = self.get_signing_serializer(app)
+        if s is None:
+            return None
+        val = request.cookies.get(self.get_cookie_name(app))
+        if not val:
+            return self.session_class()
+        data = self._lookup(val)
+        if data is not None:
+            return self.session_class(data)
+        max_age = int(app.permanent_session_lifetime.total_seconds())
+        try:
+            data, signed_at = s.loads(val, max_age=max_age, return_timestamp=True)
+        except BadSignature:
+            return self.session_class()
+        self._remember(app, val, data, signed_at.timestamp())
+        return self.session_class(data)
+
+    def should_set_cookie(self, app, session):
+        if session.modified and dict(session) == getattr(session, 'original', None):
+            # Marked modified but written back with identical values
+            session.modified = bool(app.config['SESSION_REFRESH_EACH_REQUEST'] and session.permanent)
+        return super().should_set_cookie(app, session)
+
+    def save_session(self, app, session, response):
+        super().save_session(app, session, response)
+        if not session:
+            return
+        # Seed the cache with the cookie we just signed so the next request skips verification
+        name = self.get_cookie_name(app)
+        for header in response.headers.getlist('Set-Cookie'):
+            if header.startswith(name + '='):
+                val = header.split(';', 1)[0][len(name) + 1:]
+                self._remember(app, val, dict(session), time.time())
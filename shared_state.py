@@ -0,0 +1,194 @@
+"""
+Cross-worker shared state: a tiny key/value store with TTLs and counters,
+used for caches and chat notifications that must be visible to every worker.
+
+Pick the backend with SHARED_STATE_URL:
+    memory://                 per-process dict (dev server, single worker)
+    sqlite:///shared_state.db SQLite file shared by all workers on the host
+                              (relative paths live in the instance folder)
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from flask import current_app
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        item = self._data.get(key)
+        if item and item[1] is not None and item[1] <= time.time():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._live(key)
+            return item[0] if item else default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        """Set only if missing; returns True if the key was stored."""
+        with self._lock:
+            if self._live(key):
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            item = self._live(key)
+            value = (item[0] if item else 0) + amount
+            self._data[key] = (value, item[1] if item else None)
+            return value
+
+    def update(self, key, fn, ttl=None):
+        """Atomically replace the value with fn(old_value_or_None); returns the new value."""
+        with self._lock:
+            item  = self._live(key)
+            value = fn(item[0] if item else None)
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteBackend:
+    def __init__(self, path):
+        self.path   = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)"
+            )
+
+    def _raw(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            # one connection per thread, reopened after a fork
+            conn = sqlite3.connect(self.path, timeout=15, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _conn(self):
+        """Write transaction; reads go through get() without taking the write lock."""
+        return _Txn(self._raw())
+
+    @staticmethod
+    def _read(conn, key):
+        row = conn.execute(
+            "SELECT value, expires FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row and row[1] is not None and row[1] <= time.time():
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            return None
+        return row
+
+    def get(self, key, default=None):
+        # Autocommit read: WAL readers never wait on, or block, the writer.
+        # Expired rows are skipped here and deleted by the next write to the key.
+        row = self._raw().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value, ttl=None):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+
+    def add(self, key, value, ttl=None):
+        with self._conn() as conn:
+            if self._read(conn, key):
+                return False
+            conn.execute(
+                "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+            return True
+
+    def incr(self, key, amount=1):
+        with self._conn() as conn:
+            row   = self._read(conn, key)
+            value = (json.loads(row[0]) if row else 0) + amount
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), row[1] if row else None)
+            )
+            return value
+
+    def update(self, key, fn, ttl=None):
+        with self._conn() as conn:
+            row   = self._read(conn, key)
+            value = fn(json.loads(row[0]) if row else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+            return value
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+
+class _Txn:
+    """`with` block wrapping one IMMEDIATE transaction, so read-modify-write is atomic."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, *_):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def make_backend(url, instance_path="."):
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        if not os.path.isabs(path):
+            os.makedirs(instance_path, exist_ok=True)
+            path = os.path.join(instance_path, path)
+        return SQLiteBackend(path)
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+def init_app(app):
+    app.extensions['shared_state'] = make_backend(
+        app.config.get('SHARED_STATE_URL', 'memory://'), app.instance_path
+    )
+
+
+def get_backend():
+    return current_app.extensions['shared_state']
+
+
+# ─── Chat notifications ─────────────────────────
+# Writers bump a per-channel version; pollers compare it with the version
+# they last saw and skip the DB entirely when nothing changed.
+def notify(channel):
+    return get_backend().incr(f"notify:{channel}")
+
+
+def version(channel):
+    return get_backend().get(f"notify:{channel}", 0)
@@ -1,9 +1,15 @@
 from flask import (
     Blueprint, render_template, redirect, url_for,
-    session, abort, flash, request
+    session, abort, flash, request, jsonify
 )
-from werkzeug.security import generate_password_hash
-from models import db, User, Store, Product, ChatSession, Message, Order
+from passwords import hash_password
+from models import db, User, Store, Product, ChatSession, ChatSessionEnd, Message, Order, ProductStats
+from shared_state import notify
+from archive import session_messages, ended_at
+from http_cache import catalog_page
+from load_shed import shed_when_busy
+import live_board
+import analytics
 
 store_bp = Blueprint('store', __name__)
 
@@ -14,6 +20,8 @@ def require_store_admin():
 
 
 @store_bp.route('/stores')
+@catalog_page
+@shed_when_busy
 def list_stores():
     stores = Store.query.all()
     return render_template('store_list.html', stores=stores)
@@ -54,17 +62,28 @@ def dashboard():
     )
     ended_sessions = (
         ChatSession.query.join(Product)
+                   .outerjoin(ChatSessionEnd)
                    .filter(
                        Product.store_id==store.id,
                        ChatSession.active==False
                    )
-                   .order_by(ChatSession.created_at.desc())
+                   .order_by(ended_at().desc())
+                   .limit(20)
                    .all()
     )
 
+    # Precomputed negotiation stats per product
+    product_stats = {
+        ps.product_id: ps
+        for ps in ProductStats.query
+                              .join(Product)
+                              .filter(Product.store_id == store.id)
+    }
+
     return render_template(
         'store_dashboard.html',
         store=store,
+        product_stats=product_stats,
         prod_count=prod_count,
         recent_orders=recent_orders,
         ai_sessions=ai_sessions,
@@ -73,6 +92,15 @@ def dashboard():
     )
 
 
+@store_bp.route('/store/board.json')
+@shed_when_busy
+def board():
+    # Polled by the dashboard: checks the session only, no Store query
+    if not session.get('is_store_admin'):
+        abort(403)
+    return jsonify(live_board.snapshot(session['store_id']))
+
+
 @store_bp.route('/store/chat/terminate/<int:session_id>')
 def terminate_session(session_id):
     store = require_store_admin()
@@ -80,14 +108,22 @@ def terminate_session(session_id):
     if cs.product.store_id != store.id:
         abort(403)
 
+    was_active, was_human = cs.active, cs.handed_to_human
     cs.active = False
     cs.handed_to_human = True
+    if was_active:
+        db.session.add(ChatSessionEnd(session_id=cs.id))
     db.session.add(Message(
         session_id=cs.id,
         role='system',
         content="**Chat terminated by store admin.**"
     ))
+    if was_active:
+        analytics.record_session_closed(cs.product_id)
     db.session.commit()
+    notify(f"chat:{cs.id}")
+    if was_active:
+        live_board.session_ended(store.id, was_human)
     flash("Chat terminated; human will take over.", "info")
     return redirect(url_for('store.dashboard'))
 
@@ -99,12 +135,7 @@ def watch_chat(session_id):
     if cs.product.store_id != store.id:
         abort(403)
 
-    messages = (
-        Message.query
-               .filter_by(session_id=cs.id)
-               .order_by(Message.timestamp)
-               .all()
-    )
+    messages = session_messages(cs)
 
     return render_template(
         'store_watch_chat.html',
@@ -133,9 +164,15 @@ def override_price(session_id):
         return redirect(url_for('store.watch_chat', session_id=session_id))
 
     # Apply override
+    old_price, was_human = cs.current_price, cs.handed_to_human
+    list_price = cs.product.price
     cs.current_price   = new_price
     cs.handed_to_human = True
     db.session.commit()
+    notify(f"chat:{cs.id}")
+    live_board.price_changed(store.id, list_price, old_price, new_price)
+    if cs.active and not was_human:
+        live_board.handed_off(store.id)
 
     flash(f"Price overridden to ${new_price:.2f}. Customer will see the updated price.", "success")
     return redirect(url_for('store.watch_chat', session_id=session_id))
@@ -154,10 +191,14 @@ def send_admin_message(session_id):
 
     text = request.form.get('message', '').strip()
     if text:
+        was_human = cs.handed_to_human
         cs.handed_to_human = True
         # Save as assistant so it renders like a bot message
         db.session.add(Message(session_id=cs.id, role='assistant', content=text))
         db.session.commit()
+        notify(f"chat:{cs.id}")
+        if cs.active and not was_human:
+            live_board.handed_off(store.id)
         flash("Your message has been sent to the customer.", "success")
 
     return redirect(url_for('store.watch_chat', session_id=session_id))
@@ -174,7 +215,7 @@ def add_admin():
         elif User.query.filter_by(username=uname).first():
             flash("Username already exists.", "danger")
         else:
-            user = User(username=uname, password_hash=generate_password_hash(pwd))
+            user = User(username=uname, password_hash=hash_password(pwd))
             store.admins.append(user)
             db.session.add(user)
             db.session.commit()
@@ -0,0 +1,193 @@
+"""
+Optional multi-store tenancy with one SQLite file per store.
+
+With TENANT_SHARDING enabled, users, stores and the store ↔ admin links
+stay in the main database (the directory). Each store's products, chat
+sessions, messages, archives, orders, deals and stats live in their own
+SQLite file, so one busy store's writes never take another store's write
+lock:
+
+    <TENANT_SHARD_DIR>/store_<id>.db      (default: instance/shards/)
+
+The session's get_bind routes every statement on a tenant table to the
+selected store's shard. The store is picked per request from the URL
+(store_id, or the store encoded in a product_id / session_id) or from the
+store admin's login. Code without a request selects one with
+`use_store(store_id)` or loops over shards with `each_store()`.
+
+A store's shard file is created when the store registers (and by init-db
+for stores that predate it). Requests never create one: an id that maps to a
+store missing from the directory answers 404, and existing shards are
+opened read-write without SQLite's create flag.
+
+Product and chat session ids are globally unique. Each shard's AUTOINCREMENT
+counters start at store_id * ID_SPAN, so `store_of(id)` recovers the store
+without a directory lookup.
+
+With sharding off (the default) nothing changes: every table lives in the
+one database. Sharding is meant for new deployments; existing tenant rows in
+the main database are not moved into shards.
+
+Config:
+    TENANT_SHARDING    route tenant tables to per-store files (default off)
+    TENANT_SHARD_DIR   directory for shard files (default: instance/shards)
+"""
+import os
+import threading
+from contextlib import contextmanager
+import sqlalchemy as sa
+from sqlalchemy.sql.util import find_tables
+from flask import current_app, g, session
+from flask_sqlalchemy.session import Session
+from werkzeug.exceptions import NotFound
+
+TENANT_TABLES = {
+    'product', 'chat_session', 'chat_session_end', 'message', 'chat_archive', 'order', 'deal',
+    'product_stats',
+}
+# Tables whose ids appear in URLs and carry the store in their range
+RANGED_TABLES = ('product', 'chat_session')
+ID_SPAN       = 10 ** 9
+
+_engines      = {}    # (shard dir, store id) -> engine, only for stores in the directory
+_engines_lock = threading.Lock()
+
+
+class UnknownStore(NotFound):
+    """A query was routed to a store that isn't in the directory."""
+
+
+def enabled():
+    return bool(current_app.config.get('TENANT_SHARDING'))
+
+
+def store_of(object_id):
+    """Store that owns a product or chat session id (sharded deployments)."""
+    return int(object_id) // ID_SPAN
+
+
+# ─── Store selection ────────────────────────────
+def current_store_id():
+    store_id = g.get('tenant_store')
+    if store_id is None:
+        raise RuntimeError("No store selected for a query on a store-owned table.")
+    return store_id
+
+
+def shard_key():
+    """Key for per-store caches: the selected store when sharded, else None."""
+    return g.get('tenant_store') if enabled() else None
+
+
+@contextmanager
+def use_store(store_id):
+    previous = g.get('tenant_store')
+    g.tenant_store = store_id
+    try:
+        yield
+    finally:
+        g.tenant_store = previous
+
+
+def each_store():
+    """Select each store in turn (once with no store when unsharded); for catalog-wide jobs."""
+    if not enabled():
+        yield None
+        return
+    from models import db, Store
+    for (store_id,) in db.session.query(Store.id).order_by(Store.id).all():
+        with use_store(store_id):
+            yield store_id
+
+
+def _select_store(endpoint, values):
+    """url_value_preprocessor: pick the request's store before the view runs."""
+    values = values or {}
+    if 'store_id' in values:
+        g.tenant_store = values['store_id']
+    elif 'product_id' in values:
+        g.tenant_store = store_of(values['product_id'])
+    elif 'session_id' in values:
+        g.tenant_store = store_of(values['session_id'])
+    elif session.get('is_store_admin'):
+        g.tenant_store = session.get('store_id')
+
+
+# ─── Shards ─────────────────────────────────────
+def _shard_dir():
+    return current_app.config.get('TENANT_SHARD_DIR') or os.path.join(current_app.instance_path, 'shards')
+
+
+def _shard_path(store_id):
+    return os.path.join(_shard_dir(), f'store_{int(store_id)}.db')
+
+
+def create_shard(store_id, metadata):
+    """Create a store's shard file and tables (store signup, init-db); safe to repeat."""
+    os.makedirs(_shard_dir(), exist_ok=True)
+    engine = sa.create_engine(f"sqlite:///{_shard_path(store_id)}")
+    try:
+        metadata.create_all(engine, tables=[metadata.tables[name] for name in sorted(TENANT_TABLES)])
+        with engine.begin() as conn:
+            for name in RANGED_TABLES:
+                # One statement, so two processes creating the same shard can't both seed it
+                conn.execute(
+                    sa.text("INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+                            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"),
+                    {'name': name, 'seq': int(store_id) * ID_SPAN}
+                )
+    finally:
+        engine.dispose()
+
+
+def _in_directory(db, store_id):
+    store = db.metadata.tables['store']
+    with db.engine.connect() as conn:
+        return conn.execute(sa.select(store.c.id).where(store.c.id == store_id)).first() is not None
+
+
+def shard_engine(store_id, db):
+    """Engine for an existing store's shard; UnknownStore (404) for any other id."""
+    key = (_shard_dir(), store_id)
+    engine = _engines.get(key)
+    if engine is None:
+        if not _in_directory(db, store_id):
+            raise UnknownStore()
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = sa.create_engine(f"sqlite:///file:{_shard_path(store_id)}?mode=rw&uri=true")
+                _engines[key] = engine
+    return engine
+
+
+def _tenant_table(mapper, clause):
+    if mapper is not None:
+        tables = [sa.inspect(mapper).persist_selectable]
+    elif clause is not None:
+        tables = find_tables(clause, include_crud=True)
+    else:
+        return None
+    for table in tables:
+        if getattr(table, 'name', None) in TENANT_TABLES:
+            return table
+    return None
+
+
+class TenantSession(Session):
+    """Flask-SQLAlchemy session that sends tenant tables to the selected store's shard."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and enabled() and _tenant_table(mapper, clause) is not None:
+            return shard_engine(current_store_id(), self._db)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def create_directory(db):
+    """Create the directory tables in the main database (sharded deployments)."""
+    tables = [t for name, t in db.metadata.tables.items() if name not in TENANT_TABLES]
+    db.metadata.create_all(db.engine, tables=tables)
+
+
+def init_app(app):
+    app.url_value_preprocessor(_select_store)
@@ -0,0 +1,22 @@
+"""
+Production entry point.
+
+Single worker (dev):   python app.py
+Multiple workers:      SHARED_STATE_URL=sqlite:///shared_state.db \
+                       gunicorn -w 4 -b 0.0.0.0:8000 wsgi:app
+
+Each worker builds its own app via create_app(). Workers share:
+  - the database (DATABASE_URL, default sqlite:///chatbot.db in instance/),
+    opened in WAL mode with a busy timeout so concurrent writers queue
+    instead of failing;
+  - caches and chat notifications through SHARED_STATE_URL. Leave it at
+    memory:// only when running a single worker, otherwise one worker
+    will not see another's updates.
+  - with TENANT_SHARDING=1, one SQLite file per store under instance/shards/
+    (see tenancy.py), so stores don't queue behind each other's writes.
+
+Run `flask --app app init-db` once before starting the workers.
+"""
+from app import create_app
+
+app = create_app()